@@ -1,7 +1,12 @@
+from django import forms
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
-from .models import User, MenuItem, Promo, Booking, MenuPromo
+from .models import (User, MenuItem, Promo, Booking, MenuPromo, SlotReservation, Job,
+                     AccessToken)
+from .reservations import SlotUnavailable, sync_booking
+from .search import search_ids
 
 
 class CustomUserAdmin(BaseUserAdmin):
@@ -47,6 +52,11 @@ class MenuItemAdmin(admin.ModelAdmin):
     search_fields = ('name', 'description')
     list_editable = ('price', 'is_popular', 'is_active', 'sort_order')
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=search_ids(search_term)), False
+
     fieldsets = (
         ('Основная информация', {
          'fields': ('name', 'type', 'description', 'price')}),
@@ -63,14 +73,56 @@ class PromoAdmin(admin.ModelAdmin):
     search_fields = ('title', 'description')
 
 
+class BookingAdminForm(forms.ModelForm):
+    class Meta:
+        model = Booking
+        fields = '__all__'
+
+    def _post_clean(self):
+        super()._post_clean()
+        if self.errors:
+            return
+        # Пробное резервирование в точке сохранения, которая сразу откатывается:
+        # нехватка мест показывается ошибкой формы, а не падением при сохранении
+        try:
+            with transaction.atomic():
+                sync_booking(self.instance)
+                transaction.set_rollback(True)
+        except SlotUnavailable:
+            self.add_error('time', 'На это время нет свободных мест')
+
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
+    form = BookingAdminForm
     list_display = ('name', 'email', 'phone', 'date',
                     'time', 'persons', 'status')
     list_filter = ('status', 'date')
     search_fields = ('name', 'email', 'phone')
 
 
+@admin.register(SlotReservation)
+class SlotReservationAdmin(admin.ModelAdmin):
+    list_display = ('date', 'time', 'persons')
+    list_filter = ('date',)
+    readonly_fields = ('date', 'time', 'persons')
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_at', 'locked_by')
+    list_filter = ('status', 'name')
+    readonly_fields = ('last_error',)
+
+
+@admin.register(AccessToken)
+class AccessTokenAdmin(admin.ModelAdmin):
+    list_display = ('user', 'created_at', 'expires_at', 'last_used_at')
+    search_fields = ('user__email',)
+    raw_id_fields = ('user',)
+    readonly_fields = ('key', 'created_at', 'last_used_at')
+
+
 @admin.register(MenuPromo)
 class MenuPromoAdmin(admin.ModelAdmin):
     list_display = ('menu_item', 'promo', 'discount_percent')
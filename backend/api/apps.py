@@ -2,4 +2,11 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'api'
\ No newline at end of file
+    name = 'api'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from . import checks, signals  # noqa: F401
+
+        post_migrate.connect(signals.rebuild_search_index, sender=self)
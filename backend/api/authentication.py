@@ -0,0 +1,109 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import DatabaseError
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+logger = logging.getLogger(__name__)
+
+USER_KEY = 'auth:user:{}'
+TOKEN_KEY = 'auth:token:{}'
+
+# Отдельный кэш, см. CACHES['auth'] в настройках
+cache = caches['auth']
+
+_last_used = {}
+_last_used_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def get_cached_user(user_id):
+    # Снимок пользователя по id; сбрасывается сигналами при сохранении или удалении
+    key = USER_KEY.format(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = get_user_model()._default_manager.filter(pk=user_id).first()
+        if user is None:
+            return None
+        cache.set(key, user, settings.AUTH_CACHE_TTL)
+    return user
+
+
+def invalidate_user(user_id):
+    cache.delete(USER_KEY.format(user_id))
+
+
+def invalidate_token(key):
+    cache.delete(TOKEN_KEY.format(key))
+
+
+def touch_token(key):
+    # Время последнего использования копится в памяти и пишется одним запросом
+    # не чаще раза в TOKEN_LAST_USED_INTERVAL секунд на процесс
+    global _last_used, _flushed_at
+    with _last_used_lock:
+        _last_used[key] = timezone.now()
+        if time.monotonic() - _flushed_at < settings.TOKEN_LAST_USED_INTERVAL:
+            return
+        pending, _last_used = _last_used, {}
+        _flushed_at = time.monotonic()
+    flush_last_used(pending)
+
+
+def flush_last_used(pending):
+    from .models import AccessToken
+
+    if not pending:
+        return
+    tokens = [AccessToken(key=key, last_used_at=used_at) for key, used_at in pending.items()]
+    try:
+        AccessToken.objects.bulk_update(tokens, ['last_used_at'], batch_size=500)
+    except DatabaseError:
+        logger.warning('Не удалось сохранить время использования токенов', exc_info=True)
+
+
+class CachedModelBackend(ModelBackend):
+    # Пользователь сессии берётся из кэша, без запроса на каждую страницу
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def get_model(self):
+        from .models import AccessToken
+        return AccessToken
+
+    def authenticate_credentials(self, key):
+        token_key = TOKEN_KEY.format(key)
+        cached = cache.get(token_key)
+        if cached is None:
+            token = self.get_model().objects.select_related('user').filter(key=key).first()
+            if token is None:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            user, expires_at = token.user, token.expires_at
+            ttl = min(settings.AUTH_CACHE_TTL, int((expires_at - timezone.now()).total_seconds()))
+            if ttl > 0:
+                cache.set(token_key, (user.pk, expires_at), ttl)
+                cache.set(USER_KEY.format(user.pk), user, settings.AUTH_CACHE_TTL)
+        else:
+            user_id, expires_at = cached
+            user = get_cached_user(user_id)
+            if user is None:
+                invalidate_token(key)
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if expires_at <= timezone.now():
+            raise exceptions.AuthenticationFailed('Срок действия токена истёк')
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        touch_token(key)
+        return (user, key)
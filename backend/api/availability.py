@@ -0,0 +1,116 @@
+from array import array
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import SlotReservation
+
+OPENING_TIME = time(8, 0)
+CLOSING_TIME = time(23, 0)
+ACTIVE_STATUSES = ('new', 'confirmed')
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def slot_index(slot):
+    return (_minutes(slot) - _minutes(OPENING_TIME)) // settings.BOOKING_SLOT_MINUTES
+
+
+def slot_time(index):
+    start = datetime.combine(datetime.min, OPENING_TIME)
+    return (start + timedelta(minutes=index * settings.BOOKING_SLOT_MINUTES)).time()
+
+
+class DayAvailability:
+    def __init__(self, day, occupancy):
+        self.day = day
+        self.capacity = settings.BOOKING_CAPACITY
+        self.slot_minutes = settings.BOOKING_SLOT_MINUTES
+        self.occupancy = occupancy
+
+    @classmethod
+    def slot_count(cls):
+        return (_minutes(CLOSING_TIME) - _minutes(OPENING_TIME)) // settings.BOOKING_SLOT_MINUTES + 1
+
+    @classmethod
+    def span(cls, booking_time):
+        # Слоты, которые занимает бронь: от начала до конца визита
+        offset = _minutes(booking_time) - _minutes(OPENING_TIME)
+        slot = settings.BOOKING_SLOT_MINUTES
+        start = offset // slot
+        end = -(-(offset + settings.BOOKING_DURATION_MINUTES) // slot)
+        return max(start, 0), min(end, cls.slot_count())
+
+    @classmethod
+    def empty(cls, day):
+        return cls(day, array('I', bytes(4 * cls.slot_count())))
+
+    @classmethod
+    def from_bookings(cls, day, rows):
+        availability = cls.empty(day)
+        for booking_time, persons in rows:
+            start, end = cls.span(booking_time)
+            for index in range(start, end):
+                availability.occupancy[index] += persons
+        return availability
+
+    @classmethod
+    def from_reservations(cls, day, rows):
+        availability = cls.empty(day)
+        slot_count = len(availability.occupancy)
+        for slot, persons in rows:
+            index = slot_index(slot)
+            if 0 <= index < slot_count and persons > 0:
+                availability.occupancy[index] = persons
+        return availability
+
+    def slot_time(self, index):
+        return slot_time(index)
+
+    def free_seats(self, booking_time):
+        start, end = self.span(booking_time)
+        if start >= end:
+            return 0
+        return self.capacity - max(self.occupancy[start:end])
+
+    def can_book(self, booking_time, persons):
+        return persons <= self.free_seats(booking_time)
+
+    def slots(self):
+        # Свободные места для брони в каждом слоте (минимум по длительности визита)
+        slot_count = len(self.occupancy)
+        width = -(-settings.BOOKING_DURATION_MINUTES // self.slot_minutes)
+        result = []
+        for index in range(slot_count):
+            busy = max(self.occupancy[index:min(index + width, slot_count)])
+            result.append((self.slot_time(index), self.capacity - busy))
+        return result
+
+    def free_slots(self, persons=1):
+        return [slot for slot, free in self.slots() if free >= persons]
+
+
+def cache_key(day):
+    return 'booking:slots:{}:{}:{}'.format(
+        settings.BOOKING_SLOT_MINUTES, settings.BOOKING_DURATION_MINUTES, day.isoformat())
+
+
+def get_day_availability(day, fresh=False):
+    # Кэш сбрасывается только в процессе, который изменил бронь, поэтому живёт
+    # недолго и годится для показа слотов. Проверки перед бронированием читают
+    # занятость из базы (fresh=True), окончательно места проверяет reserve()
+    occupancy = None if fresh else cache.get(cache_key(day))
+    if occupancy is None:
+        rows = SlotReservation.objects.filter(date=day).values_list('time', 'persons')
+        availability = DayAvailability.from_reservations(day, rows)
+        cache.set(cache_key(day), availability.occupancy, settings.BOOKING_AVAILABILITY_TTL)
+        return availability
+    return DayAvailability(day, occupancy)
+
+
+def invalidate_day(day):
+    if day:
+        cache.delete(cache_key(day))
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+CREATED = 'booking.created'
+STATUS = 'booking.status'
+RESET = 'reset'
+
+# Номера событий живут в памяти процесса: после перезапуска Last-Event-ID
+# прошлого процесса не совпадёт по префиксу и клиент получит reset
+_boot = format(int(time.time() * 1000), 'x')
+
+
+class Event:
+    def __init__(self, seq, name, data):
+        self.seq = seq
+        self.id = f'{_boot}-{seq}'
+        self.name = name
+        self.data = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+    def encode(self):
+        return f'id: {self.id}\nevent: {self.name}\ndata: {self.data}\n\n'.encode()
+
+
+class Subscription:
+    def __init__(self, loop=None):
+        self.loop = loop
+        size = settings.BOOKING_STREAM_QUEUE
+        self.queue = asyncio.Queue(size) if loop else queue.Queue(size)
+        self.overflowed = False
+
+    def put(self, event):
+        if self.loop is None:
+            self._put(event)
+        else:
+            self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except (asyncio.QueueFull, queue.Full):
+            # Медленный клиент отключается и догоняет по Last-Event-ID из буфера
+            self.overflowed = True
+
+
+class Broker:
+    def __init__(self, size):
+        self.lock = threading.Lock()
+        self.events = deque(maxlen=size)
+        self.seq = 0
+        self.subscribers = set()
+
+    def publish(self, name, data):
+        with self.lock:
+            self.seq += 1
+            event = Event(self.seq, name, data)
+            self.events.append(event)
+            for subscription in self.subscribers:
+                subscription.put(event)
+        return event
+
+    def backlog(self, last_event_id):
+        # None — пропущенные события уже вытеснены из буфера
+        boot, _, seq = (last_event_id or '').partition('-')
+        if boot != _boot or not seq.isdigit():
+            return None
+        seq = int(seq)
+        first = self.events[0].seq if self.events else self.seq + 1
+        if seq < first - 1:
+            return None
+        return [event for event in self.events if event.seq > seq]
+
+    def subscribe(self, last_event_id=None, loop=None):
+        subscription = Subscription(loop)
+        with self.lock:
+            backlog = self.backlog(last_event_id) if last_event_id else []
+            self.subscribers.add(subscription)
+            latest = f'{_boot}-{self.seq}'
+        return subscription, backlog, latest
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+
+broker = Broker(settings.BOOKING_STREAM_BUFFER)
+
+
+def publish_booking(booking, previous_status=None):
+    from .serializers import BookingSerializer
+
+    data = BookingSerializer(booking).data
+    if previous_status is None:
+        return broker.publish(CREATED, data)
+    data['previous_status'] = previous_status
+    return broker.publish(STATUS, data)
+
+
+def _preamble(backlog, latest):
+    yield f'retry: {settings.BOOKING_STREAM_RETRY}\n\n'.encode()
+    if backlog is None:
+        # Клиент перечитывает список целиком и продолжает с текущего события
+        yield f'id: {latest}\nevent: {RESET}\ndata: {{}}\n\n'.encode()
+        return
+    for event in backlog:
+        yield event.encode()
+
+
+HEARTBEAT = b': ping\n\n'
+
+
+async def astream(last_event_id=None):
+    subscription, backlog, latest = broker.subscribe(last_event_id, asyncio.get_running_loop())
+    try:
+        for chunk in _preamble(backlog, latest):
+            yield chunk
+        while not subscription.overflowed:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(),
+                                               settings.BOOKING_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+                continue
+            yield event.encode()
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def stream(last_event_id=None):
+    # Под WSGI поток сервера занят соединением, пока клиент не отключится
+    subscription, backlog, latest = broker.subscribe(last_event_id)
+    try:
+        yield from _preamble(backlog, latest)
+        while not subscription.overflowed:
+            try:
+                event = subscription.queue.get(timeout=settings.BOOKING_STREAM_HEARTBEAT)
+            except queue.Empty:
+                yield HEARTBEAT
+                continue
+            yield event.encode()
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,73 @@
+from functools import partial
+
+from django.db import transaction
+
+from .availability import ACTIVE_STATUSES, invalidate_day
+from .booking_events import publish_booking
+from .metrics import inc
+from .models import Booking
+from .reservations import SlotUnavailable, release_many, reserve
+from .serializers import BookingSerializer
+
+
+def create_bookings(items, context):
+    results = []
+    bookings = []
+    for index, item in enumerate(items):
+        serializer = BookingSerializer(data=item, context=context)
+        if not serializer.is_valid():
+            results.append({'index': index, 'errors': serializer.errors})
+            continue
+        booking = Booking(**serializer.validated_data)
+        try:
+            with transaction.atomic():
+                reserve(booking.date, booking.time, booking.persons)
+        except SlotUnavailable:
+            results.append({'index': index, 'errors': {'time': ['На это время нет свободных мест']}})
+            continue
+        bookings.append(booking)
+        results.append({'index': index, 'booking': booking})
+
+    Booking.objects.bulk_create(bookings)
+    if bookings:
+        transaction.on_commit(partial(inc, 'bookings_created_total', len(bookings)))
+    for booking in bookings:
+        transaction.on_commit(partial(invalidate_day, booking.date))
+        transaction.on_commit(partial(publish_booking, booking))
+    for result in results:
+        booking = result.pop('booking', None)
+        if booking is not None:
+            result['id'] = booking.pk
+    return results
+
+
+def transition_bookings(items):
+    bookings = Booking.objects.in_bulk([item['id'] for item in items])
+    results = []
+    changed = []
+    released = []
+    for item in items:
+        booking = bookings.get(item['id'])
+        if booking is None:
+            results.append({'id': item['id'], 'error': 'Бронирование не найдено'})
+            continue
+        if not booking.can_transition_to(item['status']):
+            results.append({'id': booking.pk, 'error': (
+                f'Недопустимый переход: {booking.status} -> {item["status"]}')})
+            continue
+        if booking.status in ACTIVE_STATUSES and item['status'] not in ACTIVE_STATUSES:
+            released.append(booking)
+        if booking.status != item['status']:
+            transaction.on_commit(partial(
+                inc, 'booking_status_transitions_total',
+                **{'from': booking.status, 'to': item['status']}))
+            transaction.on_commit(partial(publish_booking, booking, booking.status))
+            booking.status = item['status']
+            changed.append(booking)
+        results.append({'id': booking.pk, 'status': booking.status})
+
+    release_many(released)
+    Booking.objects.bulk_update(changed, ['status'])
+    for day in {booking.date for booking in released}:
+        transaction.on_commit(partial(invalidate_day, day))
+    return results
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_default_cache(app_configs, **kwargs):
+    # Версия контента и счётчики попыток входа живут в кэше default
+    if not isinstance(caches['default'], LocMemCache):
+        return []
+    return [Warning(
+        'Кэш default локален для процесса: изменения меню и акций не доходят до других '
+        'воркеров, а лимит попыток входа считается в каждом процессе отдельно.',
+        hint='Укажите общий кэш через CACHE_BACKEND и CACHE_LOCATION.',
+        id='api.W002',
+    )]
+
+
+@register(Tags.caches, deploy=True)
+def check_auth_cache(app_configs, **kwargs):
+    # Локальный кэш не виден другим воркерам: отзыв токенов опаздывает на AUTH_CACHE_TTL
+    if not isinstance(caches['auth'], LocMemCache):
+        return []
+    return [Warning(
+        'Кэш auth локален для процесса: отзыв токенов, блокировка и смена пароля '
+        f'дойдут до других воркеров с задержкой до {settings.AUTH_CACHE_TTL} с.',
+        hint='Укажите общий кэш через AUTH_CACHE_BACKEND и AUTH_CACHE_LOCATION.',
+        id='api.W001',
+    )]
@@ -0,0 +1,63 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
+
+from .content_version import get_modified_at, get_version
+from .promo_schedule import get_promo_timeline
+
+
+def _has_messages(request):
+    return 'messages' in request.COOKIES
+
+
+def content_etag(request, *args, **kwargs):
+    if hasattr(request, '_content_validators'):
+        return request._content_validators[0]
+    if _has_messages(request):
+        return None
+    user = request.user
+    # Разные адреса, ?fields= и форматы DRF (JSON или browsable API) —
+    # разные представления и не должны делить один сильный ETag
+    parts = [
+        get_version(),
+        get_promo_timeline().next_boundary().isoformat(),
+        request.get_full_path(),
+        getattr(request, 'accepted_media_type', ''),
+        request.META.get('HTTP_AUTHORIZATION', ''),
+    ]
+    if user.is_authenticated:
+        parts += [user.pk, user.first_name, user.last_name, user.is_staff]
+    return hashlib.sha256('|'.join(map(str, parts)).encode()).hexdigest()
+
+
+def content_last_modified(request, *args, **kwargs):
+    if hasattr(request, '_content_validators'):
+        return request._content_validators[1]
+    if _has_messages(request):
+        return None
+    return max(get_modified_at(), get_promo_timeline().window_start())
+
+
+def _validators(request):
+    return content_etag(request), content_last_modified(request)
+
+
+def conditional_content(view):
+    # 304 отдаётся до выборки данных и рендеринга, если меню и акции не менялись
+    checked = condition(etag_func=content_etag, last_modified_func=content_last_modified)(view)
+    if iscoroutinefunction(view):
+        conditional = checked
+
+        # condition() вызывает функции синхронно, а им нужны кэш, сессия и БД:
+        # для async-представлений значения считаются заранее в потоке
+        @wraps(view)
+        async def prepared(request, *args, **kwargs):
+            request.user = await request.auser()
+            request._content_validators = await sync_to_async(_validators)(request)
+            return await conditional(request, *args, **kwargs)
+        checked = prepared
+    return vary_on_headers('Accept')(cache_control(private=True, no_cache=True)(checked))
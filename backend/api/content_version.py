@@ -0,0 +1,36 @@
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+
+VERSION_KEY = 'content:version'
+MODIFIED_KEY = 'content:modified'
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def aget_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, time.time_ns(), None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+    cache.set(MODIFIED_KEY, int(time.time()), None)
+
+
+def get_modified_at():
+    cache.add(MODIFIED_KEY, int(time.time()), None)
+    return datetime.fromtimestamp(cache.get(MODIFIED_KEY), tz=dt_timezone.utc)
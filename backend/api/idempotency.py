@@ -0,0 +1,82 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .lru import LRUCache
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+_responses = LRUCache(settings.IDEMPOTENCY_CACHE_SIZE, settings.IDEMPOTENCY_TTL)
+
+
+def _replay(stored, fingerprint):
+    status_code, body, stored_fingerprint = stored
+    if stored_fingerprint != fingerprint:
+        return Response({'error': 'Ключ уже использован для другого запроса'}, status=422)
+    response = Response(json.loads(body) if body else None, status=status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    # Повтор запроса с тем же ключом возвращает сохранённый ответ без повторной обработки
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({'error': 'Слишком длинный ключ идемпотентности'}, status=400)
+
+        user_id = request.user.pk if request.user.is_authenticated else ''
+        scope = f'{request.path}:{user_id}'
+        fingerprint = hashlib.sha256(request.body).hexdigest()
+
+        stored = _responses.get((scope, key))
+        if stored is not None:
+            return _replay(stored, fingerprint)
+
+        now = timezone.now()
+        record = IdempotencyKey.objects.filter(key=key, scope=scope).first()
+        if record and record.expires_at <= now:
+            record.delete()
+            record = None
+        if record:
+            if record.status_code is None:
+                return Response({'error': 'Запрос с этим ключом ещё выполняется'}, status=409)
+            stored = (record.status_code, record.response_body, record.fingerprint)
+            _responses.set((scope, key), stored)
+            return _replay(stored, fingerprint)
+
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    key=key, scope=scope, fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL))
+        except IntegrityError:
+            return Response({'error': 'Запрос с этим ключом ещё выполняется'}, status=409)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500:
+            record.delete()
+            return response
+
+        record.status_code = response.status_code
+        record.response_body = json.dumps(response.data, cls=JSONEncoder)
+        record.save(update_fields=['status_code', 'response_body'])
+        _responses.set((scope, key), (record.status_code, record.response_body, fingerprint))
+        return response
+    return wrapper
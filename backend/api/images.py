@@ -0,0 +1,111 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+from .content_version import bump_version
+
+FORMATS = {
+    'avif': ('AVIF', 'image/avif', {'quality': 50}),
+    'webp': ('WEBP', 'image/webp', {'quality': 75, 'method': 6}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+
+
+def available_formats():
+    return [fmt for fmt in FORMATS if features.check('jpg' if fmt == 'jpeg' else fmt)]
+
+
+def derivative_name(source_name, digest, width, fmt):
+    # menu_images/tea.png -> menu_images/tea.1a2b3c4d5e6f.320w.webp
+    stem, _ = os.path.splitext(source_name)
+    return f'{stem}.{digest}.{width}w.{fmt}'
+
+
+def _encode(image, fmt):
+    pil_format, _, options = FORMATS[fmt]
+    if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.convert('RGBA').getchannel('A'))
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def build_variants(field_file, previous=None):
+    storage = field_file.storage
+    with storage.open(field_file.name, 'rb') as source:
+        content = source.read()
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    # Хранилище может сохранить файл под другим именем (ContentHashStorage),
+    # поэтому уже готовые варианты ищутся по именам из прошлого манифеста
+    known = previous.get('variants', {}) if previous and previous.get('hash') == digest else {}
+
+    image = ImageOps.exif_transpose(Image.open(BytesIO(content)))
+    if image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    widths = sorted({min(width, image.width) for width in settings.IMAGE_DERIVATIVE_WIDTHS})
+    variants = {}
+    for fmt in available_formats():
+        variants[fmt] = {}
+        for width in widths:
+            name = (known.get(fmt, {}).get(str(width))
+                    or derivative_name(field_file.name, digest, width, fmt))
+            if not storage.exists(name):
+                height = round(image.height * width / image.width)
+                resized = image.resize((width, height), Image.LANCZOS) if width < image.width else image
+                name = storage.save(derivative_name(field_file.name, digest, width, fmt),
+                                    ContentFile(_encode(resized, fmt)))
+            variants[fmt][str(width)] = name
+    return {'source': field_file.name, 'hash': digest, 'variants': variants}
+
+
+def srcset(field_file, manifest, fmt):
+    variants = manifest.get('variants', {}).get(fmt, {}) if manifest else {}
+    return ', '.join(
+        f'{field_file.storage.url(name)} {width}w'
+        for width, name in sorted(variants.items(), key=lambda pair: int(pair[0]))
+    )
+
+
+def variant_url(field_file, manifest, width, fmt='webp'):
+    variants = manifest.get('variants', {}).get(fmt, {}) if manifest else {}
+    if not variants:
+        return field_file.url if field_file else None
+    # Наименьший вариант не уже запрошенной ширины
+    widths = sorted(int(w) for w in variants)
+    chosen = next((w for w in widths if w >= width), widths[-1])
+    return field_file.storage.url(variants[str(chosen)])
+
+
+def mime_type(fmt):
+    return FORMATS[fmt][1]
+
+
+def variants_outdated(instance):
+    if not instance.image:
+        return bool(instance.image_variants)
+    return instance.image_variants.get('source') != instance.image.name
+
+
+def refresh_variants(instance, force=False):
+    if not force and not variants_outdated(instance):
+        return False
+    manifest = build_variants(instance.image, instance.image_variants) if instance.image else {}
+    if manifest == instance.image_variants:
+        return False
+    type(instance).objects.filter(pk=instance.pk).update(image_variants=manifest)
+    instance.image_variants = manifest
+    return True
+
+
+def refresh_variants_task(model, pk):
+    instance = apps.get_model(model).objects.filter(pk=pk).first()
+    if instance is not None and refresh_variants(instance):
+        bump_version()
@@ -0,0 +1,235 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+# Вложенные вызовы (get_many -> get, вложенные сериализаторы) не считаются повторно
+_nested = ContextVar('instrumentation_nested', default=False)
+
+IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+_missing = object()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.statements = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.render_time = 0.0
+        self.serializer_time = 0.0
+
+    def repeated_queries(self):
+        threshold = settings.INSTRUMENTATION_REPEAT_THRESHOLD
+        return [(sql, count) for sql, count in self.statements.most_common()
+                if count >= threshold]
+
+    def server_timing(self, total):
+        return ', '.join([
+            f'sql;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries"',
+            f'cache;desc="hits={self.cache_hits} misses={self.cache_misses}"',
+            f'render;dur={self.render_time * 1000:.1f}',
+            f'serializer;dur={self.serializer_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def current():
+    return _current.get()
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if metrics is not None:
+            metrics.sql_count += 1
+            metrics.sql_time += time.perf_counter() - started
+            # Запросы с разными параметрами и длиной IN (...) считаются одинаковыми
+            metrics.statements[IN_LIST.sub('(...)', sql)] += 1
+
+
+def _attach(connection, **kwargs):
+    # Обёртка остаётся на подключении навсегда: async-представления выполняют SQL
+    # в других потоках, а метрики запроса находятся через contextvar
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _timed(attribute):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = _current.get()
+            if metrics is None or _nested.get():
+                return func(*args, **kwargs)
+            token = _nested.set(True)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                setattr(metrics, attribute, getattr(metrics, attribute) + time.perf_counter() - started)
+                _nested.reset(token)
+        wrapper.instrumented = True
+        return wrapper
+    return decorator
+
+
+def _counted_get(func):
+    @wraps(func)
+    def wrapper(self, key, default=None, version=None):
+        metrics = _current.get()
+        if metrics is None or _nested.get():
+            return func(self, key, default, version)
+        token = _nested.set(True)
+        try:
+            value = func(self, key, _missing, version)
+        finally:
+            _nested.reset(token)
+        if value is _missing:
+            metrics.cache_misses += 1
+            return default
+        metrics.cache_hits += 1
+        return value
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _counted_get_many(func):
+    @wraps(func)
+    def wrapper(self, keys, version=None):
+        metrics = _current.get()
+        if metrics is None or _nested.get():
+            return func(self, keys, version)
+        keys = list(keys)
+        token = _nested.set(True)
+        try:
+            values = func(self, keys, version)
+        finally:
+            _nested.reset(token)
+        metrics.cache_hits += len(values)
+        metrics.cache_misses += len(keys) - len(values)
+        return values
+    wrapper.instrumented = True
+    return wrapper
+
+
+class TimedTemplate(Template):
+    render = _timed('render_time')(Template.render)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    # Бэкенд шаблонов из TEMPLATES: время рендеринга без подмены классов Django
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class TimedSerializerMixin:
+    # Подмешивается к сериализаторам проекта; сторонние сериализаторы не замеряются
+    @_timed('serializer_time')
+    def is_valid(self, *args, **kwargs):
+        return super().is_valid(*args, **kwargs)
+
+    @property
+    @_timed('serializer_time')
+    def data(self):
+        return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+def _cache_backends():
+    for alias in settings.CACHES.values():
+        yield from import_string(alias['BACKEND']).__mro__
+
+
+def _patch(owner, name, decorator):
+    func = owner.__dict__.get(name)
+    if func is None or getattr(func, 'instrumented', False):
+        return
+    setattr(owner, name, decorator(func))
+
+
+def _unpatch(owner, name):
+    func = owner.__dict__.get(name)
+    if getattr(func, 'instrumented', False):
+        setattr(owner, name, func.__wrapped__)
+
+
+def install():
+    connection_created.connect(_attach)
+    # Счётчики кэша подменяют методы классов бэкендов для всего процесса,
+    # включая сторонний код, поэтому включаются отдельно и снимаются uninstall()
+    if settings.INSTRUMENTATION_CACHE:
+        for cls in _cache_backends():
+            _patch(cls, 'get', _counted_get)
+            _patch(cls, 'get_many', _counted_get_many)
+
+
+def uninstall():
+    connection_created.disconnect(_attach)
+    for connection in connections.all(initialized_only=True):
+        if _record_query in connection.execute_wrappers:
+            connection.execute_wrappers.remove(_record_query)
+    for cls in _cache_backends():
+        _unpatch(cls, 'get')
+        _unpatch(cls, 'get_many')
+
+
+class instrument:
+    # Контекст одного запроса: включает учёт SQL на всех подключениях
+    def __enter__(self):
+        self.metrics = RequestMetrics()
+        self.token = _current.set(self.metrics)
+        for connection in connections.all():
+            _attach(connection)
+        return self.metrics
+
+    def __exit__(self, *exc_info):
+        _current.reset(self.token)
+
+
+def log_request(request, response, metrics, total):
+    match = getattr(request, 'resolver_match', None)
+    repeated = metrics.repeated_queries()
+    record = {
+        'method': request.method,
+        'path': request.path,
+        'view': match.view_name if match else None,
+        'status': response.status_code,
+        'duration_ms': round(total * 1000, 2),
+        'sql_count': metrics.sql_count,
+        'sql_ms': round(metrics.sql_time * 1000, 2),
+        'cache_hits': metrics.cache_hits,
+        'cache_misses': metrics.cache_misses,
+        'render_ms': round(metrics.render_time * 1000, 2),
+        'serializer_ms': round(metrics.serializer_time * 1000, 2),
+    }
+    if repeated:
+        record['n_plus_one'] = [{'sql': sql, 'count': count} for sql, count in repeated]
+        logger.warning(json.dumps(record, ensure_ascii=False))
+    else:
+        logger.info(json.dumps(record, ensure_ascii=False))
+    return record
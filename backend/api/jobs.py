@@ -0,0 +1,90 @@
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def _task_name(func):
+    if isinstance(func, str):
+        return func
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, key=None, delay=0, max_attempts=5, **payload):
+    # Задача видна обработчику только после коммита текущей транзакции
+    name = _task_name(func)
+    if settings.JOBS_RUN_INLINE:
+        transaction.on_commit(partial(import_string(name), **payload))
+        return None
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name, payload=payload, key=key, max_attempts=max_attempts,
+                run_at=timezone.now() + timedelta(seconds=delay))
+    except IntegrityError:
+        # Такая же задача уже ждёт выполнения
+        return Job.objects.filter(key=key, status__in=['queued', 'running']).first()
+
+
+def requeue_stale():
+    deadline = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    return Job.objects.filter(status='running', locked_at__lt=deadline).update(
+        status='queued', locked_at=None, locked_by='')
+
+
+def claim(worker_id):
+    now = timezone.now()
+    candidates = Job.objects.filter(status='queued', run_at__lte=now).order_by(
+        'run_at', 'id').values_list('id', flat=True)[:10]
+    for job_id in candidates:
+        # Условный UPDATE: задачу получает только один обработчик
+        claimed = Job.objects.filter(id=job_id, status='queued').update(
+            status='running', locked_at=now, locked_by=worker_id)
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def run(job):
+    try:
+        import_string(job.name)(**job.payload)
+    except Exception:
+        job.attempts += 1
+        job.last_error = traceback.format_exc()
+        job.locked_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            logger.error('Задача %s окончательно завершилась ошибкой', job)
+        else:
+            job.status = 'queued'
+            backoff = settings.JOBS_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            job.run_at = timezone.now() + timedelta(seconds=backoff)
+        job.save(update_fields=['attempts', 'last_error', 'locked_at', 'status', 'run_at'])
+        return False
+    job.delete()
+    return True
+
+
+def work(worker_id=None, once=False):
+    worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+    while True:
+        requeue_stale()
+        job = claim(worker_id)
+        if job is not None:
+            run(job)
+            continue
+        if once:
+            return
+        time.sleep(settings.JOBS_POLL_INTERVAL)
@@ -0,0 +1,323 @@
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.test.utils import override_settings
+from django.utils import timezone
+
+# Все виртуальные клиенты входят с одного адреса: у сервера, который тест
+# поднимает сам, ограничение попыток отключается, иначе вход упрётся в 429
+NO_THROTTLE = {'THROTTLE_ENABLED': 'False'}
+
+# Учётные записи, которые создаёт manage.py seed_load
+LOAD_EMAIL = 'load{}@example.com'
+LOAD_PASSWORD = 'load-test-pass'
+
+# (вес, имя, метод, путь) — просмотр меню преобладает над входом и бронированием
+BROWSE = [
+    (20, 'home', 'GET', '/'),
+    (20, 'menu_page', 'GET', '/menu/'),
+    (10, 'menu_page_type', 'GET', '/menu/?type=coffee'),
+    (10, 'promo_page', 'GET', '/promo/'),
+    (15, 'api_menu', 'GET', '/api/menu/'),
+    (5, 'api_menu_type', 'GET', '/api/menu/?type=tea'),
+    (5, 'api_menu_search', 'GET', '/api/menu/?q=%D0%BB%D0%B0%D1%82%D1%82%D0%B5'),
+    (5, 'api_promo', 'GET', '/api/promo/'),
+]
+LOGIN_WEIGHT = 5
+BOOKING_WEIGHT = 5
+# full — просмотр, вход и бронирования; browse — только чтение меню и акций
+MIXES = ('full', 'browse')
+
+
+class HttpConnection:
+    # Минимальный HTTP/1.1-клиент на asyncio с keep-alive, без сторонних зависимостей
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers=None, body=b''):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}',
+                 f'Content-Length: {len(body)}']
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            await self.close()
+            raise ConnectionError('Соединение закрыто сервером')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in response_headers:
+            data = await self.reader.readexactly(int(response_headers['content-length']))
+        elif response_headers.get('transfer-encoding') == 'chunked':
+            data = b''
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+                data += chunk[:-2]
+        else:
+            data = await self.reader.read()
+            await self.close()
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, data
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class Stats:
+    def __init__(self):
+        self.timings = {}
+        self.errors = {}
+        self.throttled = {}
+
+    def add(self, name, elapsed, ok, throttled=False):
+        # Ответ 429 считается отдельно: это ограничение попыток, а не сбой сервера
+        self.timings.setdefault(name, []).append(elapsed)
+        if throttled:
+            self.throttled[name] = self.throttled.get(name, 0) + 1
+        elif not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def report(self, duration):
+        rows = []
+        for name in sorted(self.timings):
+            values = self.timings[name]
+            rows.append({
+                'endpoint': name,
+                'requests': len(values),
+                'errors': self.errors.get(name, 0),
+                'throttled': self.throttled.get(name, 0),
+                'rps': round(len(values) / duration, 2),
+                'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+            })
+        total = sum(len(values) for values in self.timings.values())
+        return {
+            'duration': round(duration, 2),
+            'requests': total,
+            'errors': sum(self.errors.values()),
+            'throttled': sum(self.throttled.values()),
+            'rps': round(total / duration, 2) if duration else 0,
+            'endpoints': rows,
+        }
+
+
+class VirtualUser:
+    def __init__(self, host, port, stats, rng, users, mix='full'):
+        self.connection = HttpConnection(host, port)
+        self.stats = stats
+        self.rng = rng
+        self.users = users
+        self.mix = mix
+        self.token = None
+
+    async def call(self, name, method, path, payload=None, expected=(200,)):
+        headers = {'Accept-Encoding': 'identity'}
+        body = b''
+        if payload is not None:
+            body = json.dumps(payload).encode()
+            headers['Content-Type'] = 'application/json'
+        if self.token and path.startswith('/api/booking/'):
+            headers['Authorization'] = f'Token {self.token}'
+        started = time.perf_counter()
+        try:
+            status, data = await self.connection.request(method, path, headers, body)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+            await self.connection.close()
+            self.stats.add(name, time.perf_counter() - started, False)
+            return None
+        self.stats.add(name, time.perf_counter() - started, status in expected, status == 429)
+        return data if status in expected else None
+
+    async def login(self):
+        email = LOAD_EMAIL.format(self.rng.randrange(self.users))
+        data = await self.call('api_token', 'POST', '/api/token/',
+                               {'email': email, 'password': LOAD_PASSWORD})
+        if data:
+            self.token = json.loads(data)['token']
+
+    async def book(self):
+        if self.token is None:
+            await self.login()
+            if self.token is None:
+                return
+        # Дальние даты: засеянные брони не занимают эти слоты
+        day = timezone.localdate() + timedelta(days=self.rng.randrange(31, 365))
+        await self.call('api_booking_create', 'POST', '/api/booking/', {
+            'name': 'Гость', 'phone': '+79990000000', 'email': 'guest@example.com',
+            'date': day.isoformat(), 'time': f'{self.rng.randrange(9, 20)}:00',
+            'persons': self.rng.randrange(1, 5),
+        }, expected=(201,))
+
+    async def run(self, deadline):
+        weights = [weight for weight, *_ in BROWSE]
+        if self.mix == 'full':
+            weights += [LOGIN_WEIGHT, BOOKING_WEIGHT]
+        actions = list(range(len(weights)))
+        try:
+            while time.perf_counter() < deadline:
+                action = self.rng.choices(actions, weights)[0]
+                if action < len(BROWSE):
+                    _, name, method, path = BROWSE[action]
+                    await self.call(name, method, path)
+                elif action == len(BROWSE):
+                    await self.login()
+                else:
+                    await self.book()
+        finally:
+            await self.connection.close()
+
+
+async def drive(host, port, concurrency, duration, users, seed=0, mix='full'):
+    stats = Stats()
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    deadline = started + duration
+    clients = [VirtualUser(host, port, stats, random.Random(rng.random()), users, mix)
+               for _ in range(concurrency)]
+    await asyncio.gather(*(client.run(deadline) for client in clients))
+    return stats.report(time.perf_counter() - started)
+
+
+def start_server():
+    # Сервер WSGI в фоновом потоке этого же процесса, порт выбирается системой
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+    from django.core.servers.basehttp import get_internal_wsgi_application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler, allow_reuse_address=True)
+    server.set_app(get_internal_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def run(url=None, concurrency=20, duration=30.0, users=1000, seed=0, mix='full'):
+    if url:
+        parts = urlsplit(url)
+        host, port = parts.hostname, parts.port or 80
+        return asyncio.run(drive(host, port, concurrency, duration, users, seed, mix))
+    with override_settings(THROTTLE_ENABLED=False):
+        server = start_server()
+        try:
+            host, port = server.server_address[:2]
+            return asyncio.run(drive(host, port, concurrency, duration, users, seed, mix))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wsgi_command(port, threads):
+    # gunicorn с потоками, если установлен, иначе многопоточный runserver Django
+    if importlib.util.find_spec('gunicorn'):
+        return 'gunicorn', [sys.executable, '-m', 'gunicorn', 'backend.wsgi:application',
+                            '--bind', f'127.0.0.1:{port}', '--workers', '1',
+                            '--worker-class', 'gthread', '--threads', str(threads),
+                            '--keep-alive', '75']
+    return 'runserver', [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}',
+                         '--noreload']
+
+
+def asgi_command(port):
+    if importlib.util.find_spec('uvicorn'):
+        return 'uvicorn', [sys.executable, '-m', 'uvicorn', 'backend.asgi:application',
+                           '--host', '127.0.0.1', '--port', str(port), '--workers', '1',
+                           '--no-access-log', '--timeout-keep-alive', '75']
+    if importlib.util.find_spec('hypercorn'):
+        return 'hypercorn', [sys.executable, '-m', 'hypercorn', 'backend.asgi:application',
+                             '--bind', f'127.0.0.1:{port}', '--workers', '1',
+                             '--keep-alive', '75']
+    return None, None
+
+
+class ServerProcess:
+    # Сервер в отдельном процессе: клиенты нагрузки не делят с ним GIL
+    def __init__(self, command, port, timeout=30.0, env=None):
+        self.command = command
+        self.port = port
+        self.timeout = timeout
+        self.env = env
+        self.process = None
+
+    def __enter__(self):
+        env = {**os.environ, **self.env} if self.env else None
+        self.process = subprocess.Popen(self.command, cwd=settings.BASE_DIR, env=env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.perf_counter() + self.timeout
+        while time.perf_counter() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'Сервер завершился с кодом {self.process.returncode}: '
+                                   f'{" ".join(self.command)}')
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=0.5).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError(f'Сервер не начал принимать соединения за {self.timeout} с')
+
+    def __exit__(self, *exc_info):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+
+def bench(command, port, concurrency, duration, users, seed=0, mix='browse', warmup=2.0):
+    with ServerProcess(command, port, env=NO_THROTTLE):
+        # Прогрев снимков меню и акций, чтобы в замер не попал холодный старт
+        asyncio.run(drive('127.0.0.1', port, min(concurrency, 10), warmup, users, seed, mix))
+        return asyncio.run(drive('127.0.0.1', port, concurrency, duration, users, seed, mix))
@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.loadtest import MIXES, asgi_command, bench, free_port, wsgi_command
+
+
+class Command(BaseCommand):
+    help = 'Сравнение пропускной способности WSGI и ASGI при множестве keep-alive клиентов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=200,
+                            help='Одновременных клиентов с keep-alive соединениями')
+        parser.add_argument('--duration', type=float, default=30.0, help='Секунд на сервер')
+        parser.add_argument('--users', type=int, default=1000,
+                            help='Сколько пользователей создал seed_load')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--mix', choices=MIXES, default='browse')
+        parser.add_argument('--json', dest='json_path', help='Сохранить отчёт в JSON')
+
+    def handle(self, *args, **options):
+        asgi_port = free_port()
+        asgi_name, asgi = asgi_command(asgi_port)
+        if asgi is None:
+            raise CommandError('Для замера ASGI нужен uvicorn или hypercorn: '
+                               'pip install uvicorn')
+        wsgi_port = free_port()
+        wsgi_name, wsgi = wsgi_command(wsgi_port, options['concurrency'])
+
+        params = (options['concurrency'], options['duration'], options['users'],
+                  options['seed'], options['mix'])
+        reports = {}
+        for label, name, command, port in (('wsgi', wsgi_name, wsgi, wsgi_port),
+                                           ('asgi', asgi_name, asgi, asgi_port)):
+            self.stdout.write(f'{label.upper()} ({name}): {options["concurrency"]} клиентов, '
+                              f'{options["duration"]} с...')
+            try:
+                reports[label] = bench(command, port, *params)
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+            reports[label]['server'] = name
+
+        wsgi_rows = {row['endpoint']: row for row in reports['wsgi']['endpoints']}
+        asgi_rows = {row['endpoint']: row for row in reports['asgi']['endpoints']}
+        self.stdout.write(f'{"Эндпоинт":<20}{"WSGI rps":>10}{"p50":>8}{"p99":>9}'
+                          f'{"ASGI rps":>10}{"p50":>8}{"p99":>9}')
+        empty = {'rps': 0, 'p50_ms': 0, 'p99_ms': 0}
+        for endpoint in sorted(set(wsgi_rows) | set(asgi_rows)):
+            w = wsgi_rows.get(endpoint, empty)
+            a = asgi_rows.get(endpoint, empty)
+            self.stdout.write(f'{endpoint:<20}{w["rps"]:>10}{w["p50_ms"]:>8}{w["p99_ms"]:>9}'
+                              f'{a["rps"]:>10}{a["p50_ms"]:>8}{a["p99_ms"]:>9}')
+        for label in ('wsgi', 'asgi'):
+            report = reports[label]
+            self.stdout.write(self.style.SUCCESS(
+                f'{label.upper()} ({report["server"]}): {report["requests"]} запросов, '
+                f'{report["errors"]} ошибок, {report["throttled"]} ответов 429, '
+                f'{report["rps"]} rps'))
+
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as fh:
+                json.dump(reports, fh, ensure_ascii=False, indent=2)
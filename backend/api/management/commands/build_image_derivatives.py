@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from api.content_version import bump_version
+from api.images import refresh_variants
+from api.models import MenuItem, Promo
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии изображений меню и акций'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Пересоздать варианты, даже если они уже есть')
+
+    def handle(self, *args, **options):
+        updated = 0
+        for model in (MenuItem, Promo):
+            for obj in model.objects.exclude(image='').exclude(image__isnull=True):
+                try:
+                    if refresh_variants(obj, force=options['force']):
+                        updated += 1
+                except (OSError, ValueError) as e:
+                    self.stderr.write(f'{model.__name__} #{obj.pk}: {e}')
+        if updated:
+            bump_version()
+        self.stdout.write(self.style.SUCCESS(f'Обновлено изображений: {updated}'))
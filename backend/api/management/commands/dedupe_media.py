@@ -0,0 +1,77 @@
+import os
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from api.content_version import bump_version
+from api.models import MenuItem, Promo
+from api.storage import CONTENT_PREFIX, content_name, content_storage
+
+
+class Command(BaseCommand):
+    help = 'Переносит изображения в хранилище по хэшу содержимого и удаляет дубликаты'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, что будет сделано')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        storage = content_storage
+        moved = {}
+
+        for model in (MenuItem, Promo):
+            for obj in model.objects.exclude(image='').exclude(image__isnull=True):
+                old_name = obj.image.name
+                if old_name.startswith(f'{CONTENT_PREFIX}/') or not storage.exists(old_name):
+                    continue
+                with storage.open(old_name, 'rb') as source:
+                    new_name = content_name(File(source), old_name)
+                    if not dry_run and not storage.exists(new_name):
+                        storage.save(new_name, File(source))
+                moved[old_name] = new_name
+                self.stdout.write(f'{model.__name__} #{obj.pk}: {old_name} -> {new_name}')
+                if not dry_run:
+                    manifest = dict(obj.image_variants, source=new_name) if obj.image_variants else {}
+                    model.objects.filter(pk=obj.pk).update(image=new_name, image_variants=manifest)
+
+        # Старый файл удаляется, только если на него больше никто не ссылается
+        referenced = set()
+        for model in (MenuItem, Promo):
+            referenced.update(model.objects.values_list('image', flat=True))
+
+        reclaimed = 0
+        for old_name in moved:
+            if old_name in referenced and not dry_run:
+                continue
+            size = storage.size(old_name)
+            reclaimed += size
+            if not dry_run:
+                storage.delete(old_name)
+
+        orphans = self.find_duplicates(storage, set(moved) | referenced, set(moved.values()))
+        for name, size in orphans:
+            reclaimed += size
+            self.stdout.write(f'Дубликат без ссылок: {name}')
+            if not dry_run:
+                storage.delete(name)
+
+        if moved and not dry_run:
+            bump_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено файлов: {len(moved)}, освобождено байт: {reclaimed}'))
+
+    def find_duplicates(self, storage, known, planned):
+        # Файлы вне хранилища по хэшу, чьё содержимое уже лежит в нём
+        duplicates = []
+        for root, _, files in os.walk(storage.location):
+            for filename in files:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+                if name.startswith(f'{CONTENT_PREFIX}/') or name in known:
+                    continue
+                with open(path, 'rb') as source:
+                    target = content_name(File(source), name)
+                if target in planned or storage.exists(target):
+                    duplicates.append((name, os.path.getsize(path)))
+        return duplicates
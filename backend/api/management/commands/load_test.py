@@ -0,0 +1,45 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.loadtest import MIXES, run
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест: смесь просмотра меню, входа и бронирований'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Адрес запущенного сервера, например '
+                                          'http://127.0.0.1:8000 (по умолчанию '
+                                          'сервер поднимается в этом процессе)')
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--duration', type=float, default=30.0, help='Секунд')
+        parser.add_argument('--users', type=int, default=1000,
+                            help='Сколько пользователей создал seed_load')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--mix', choices=MIXES, default='full',
+                            help='browse — только чтение, без входа и бронирований')
+        parser.add_argument('--json', dest='json_path', help='Сохранить отчёт в JSON')
+
+    def handle(self, *args, **options):
+        report = run(options['url'], options['concurrency'], options['duration'],
+                     options['users'], options['seed'], options['mix'])
+
+        self.stdout.write(f'{"Эндпоинт":<24}{"запросов":>10}{"ошибок":>8}{"429":>6}{"rps":>9}'
+                          f'{"p50, мс":>10}{"p95, мс":>10}{"p99, мс":>10}')
+        for row in report['endpoints']:
+            self.stdout.write(f'{row["endpoint"]:<24}{row["requests"]:>10}{row["errors"]:>8}'
+                              f'{row["throttled"]:>6}{row["rps"]:>9}{row["p50_ms"]:>10}'
+                              f'{row["p95_ms"]:>10}{row["p99_ms"]:>10}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего: {report["requests"]} запросов, {report["errors"]} ошибок, '
+            f'{report["rps"]} rps за {report["duration"]} с'))
+        if report['throttled']:
+            self.stdout.write(self.style.WARNING(
+                f'{report["throttled"]} запросов получили 429: сервер ограничивает попытки '
+                f'входа с одного адреса, бронирования без токена пропущены. Для замера '
+                f'запустите сервер с THROTTLE_ENABLED=False'))
+
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as fh:
+                json.dump(report, fh, ensure_ascii=False, indent=2)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api.models import AccessToken
+
+
+class Command(BaseCommand):
+    help = 'Удаляет просроченные токены доступа'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        # Удаление порциями по индексу expires_at, без долгой блокировки таблицы
+        total = 0
+        while True:
+            keys = list(AccessToken.objects.expired().values_list(
+                'key', flat=True)[:options['batch_size']])
+            if not keys:
+                break
+            AccessToken.objects.filter(key__in=keys).delete()
+            total += len(keys)
+        self.stdout.write(self.style.SUCCESS(f'Удалено токенов: {total}'))
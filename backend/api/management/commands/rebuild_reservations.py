@@ -0,0 +1,28 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import Booking
+from api.reservations import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает занятость слотов по существующим бронированиям'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat,
+                            help='Дата (по умолчанию все даты начиная с сегодняшней)')
+
+    def handle(self, *args, **options):
+        if options['date']:
+            days = [options['date']]
+        else:
+            days = Booking.objects.filter(
+                date__gte=timezone.localdate()
+            ).values_list('date', flat=True).distinct().order_by('date')
+        count = 0
+        for day in days:
+            rebuild(day)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано дней: {count}'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api.models import AccessToken
+
+
+class Command(BaseCommand):
+    help = 'Отзывает токены доступа пользователя, роли или все сразу'
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group(required=True)
+        group.add_argument('--user', help='Email пользователя')
+        group.add_argument('--role', help='Роль пользователей (поле role)')
+        group.add_argument('--all', action='store_true', help='Все токены')
+
+    def handle(self, *args, **options):
+        tokens = AccessToken.objects.all()
+        if options['user']:
+            tokens = tokens.filter(user__email=options['user'])
+        elif options['role']:
+            tokens = tokens.filter(user__role=options['role'])
+        # delete() отправляет post_delete, поэтому кэш аутентификации тоже сбрасывается
+        deleted, _ = tokens.delete()
+        self.stdout.write(self.style.SUCCESS(f'Отозвано токенов: {deleted}'))
@@ -0,0 +1,40 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.jobs import work
+
+
+def _worker(once):
+    connections.close_all()
+    work(once=once)
+
+
+class Command(BaseCommand):
+    help = 'Запускает обработчики фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Количество процессов-обработчиков')
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить готовые задачи и завершиться')
+
+    def handle(self, *args, **options):
+        if options['processes'] <= 1:
+            work(once=options['once'])
+            return
+
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_worker, args=(options['once'],), daemon=True)
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
@@ -0,0 +1,107 @@
+import random
+from datetime import time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.content_version import bump_version
+from api.loadtest import LOAD_EMAIL, LOAD_PASSWORD
+from api.models import Booking, MenuItem, MenuPromo, Promo, User
+from api.reservations import rebuild
+from api.search import rebuild_index
+
+WORDS = ('капучино', 'латте', 'раф', 'американо', 'эспрессо', 'флэт уайт', 'какао',
+         'чай', 'матча', 'сырники', 'круассан', 'чизкейк', 'брауни', 'омлет')
+FLAVOURS = ('ванильный', 'карамельный', 'ореховый', 'шоколадный', 'ягодный',
+            'миндальный', 'кокосовый', 'лавандовый', 'имбирный', 'классический')
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими данными для нагрузочного тестирования'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--menu-items', type=int, default=500)
+        parser.add_argument('--promos', type=int, default=50)
+        parser.add_argument('--bookings', type=int, default=100000)
+        parser.add_argument('--days', type=int, default=180,
+                            help='Глубина истории бронирований в днях')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Зерно генератора случайных чисел')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        today = timezone.localdate()
+
+        with transaction.atomic():
+            # Пароль хэшируется один раз: все пользователи входят с LOAD_PASSWORD
+            password = make_password(LOAD_PASSWORD)
+            start = User.objects.filter(email__startswith='load').count()
+            users = User.objects.bulk_create([
+                User(username=f'load{i}', email=LOAD_EMAIL.format(i), password=password,
+                     first_name='Гость', last_name=str(i))
+                for i in range(start, start + options['users'])
+            ], batch_size=batch_size)
+
+            types = [value for value, _ in MenuItem.TYPE_CHOICES]
+            items = MenuItem.objects.bulk_create([
+                MenuItem(name=f'{rng.choice(FLAVOURS).capitalize()} {rng.choice(WORDS)} №{i}',
+                         description=' '.join(rng.sample(WORDS + FLAVOURS, 6)),
+                         type=rng.choice(types), price=rng.randrange(90, 600, 10),
+                         is_active=rng.random() > 0.1, is_popular=rng.random() < 0.1,
+                         sort_order=i)
+                for i in range(options['menu_items'])
+            ], batch_size=batch_size)
+
+            promos = []
+            for i in range(options['promos']):
+                start_date = today - timedelta(days=rng.randrange(0, 60))
+                promos.append(Promo(
+                    title=f'Акция №{i}', description=f'Скидка на {rng.choice(WORDS)}',
+                    start_date=start_date,
+                    end_date=start_date + timedelta(days=rng.randrange(7, 90)),
+                    is_active=rng.random() > 0.2))
+            promos = Promo.objects.bulk_create(promos, batch_size=batch_size)
+
+            menu_promos = []
+            if items and promos:
+                for promo in promos:
+                    for item in rng.sample(items, min(len(items), rng.randrange(1, 20))):
+                        menu_promos.append(MenuPromo(
+                            menu_item=item, promo=promo, discount_percent=rng.randrange(5, 40, 5)))
+            MenuPromo.objects.bulk_create(menu_promos, batch_size=batch_size, ignore_conflicts=True)
+
+            # Брони распределены по истории и ближайшему месяцу; save() не вызывается,
+            # поэтому занятость слотов пересчитывается ниже
+            statuses = [value for value, _ in Booking.STATUS_CHOICES]
+            created_users = len(users)
+            users = users or list(User.objects.all()[:1000])
+            booked_days = set()
+            batch = []
+            for _ in range(options['bookings']):
+                day = today + timedelta(days=rng.randrange(-options['days'], 30))
+                booked_days.add(day)
+                batch.append(Booking(
+                    user=rng.choice(users) if users else None, name='Гость',
+                    phone='+79990000000', email='guest@example.com', date=day,
+                    time=time(rng.randrange(8, 21), rng.choice((0, 30))),
+                    persons=rng.randrange(1, 5),
+                    status=rng.choice(statuses) if day < today else 'new'))
+                if len(batch) >= batch_size:
+                    Booking.objects.bulk_create(batch)
+                    batch = []
+            Booking.objects.bulk_create(batch)
+
+        for day in sorted(day for day in booked_days if day >= today):
+            rebuild(day)
+        rebuild_index()
+        bump_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: пользователей {created_users}, позиций меню {len(items)}, '
+            f'акций {len(promos)}, связей меню-акция {len(menu_promos)}, '
+            f'бронирований {options["bookings"]}'))
@@ -0,0 +1,87 @@
+import threading
+from types import MappingProxyType
+
+from django.utils import timezone
+
+from .content_version import aget_version, get_version
+from .models import MenuItem
+from .promo_schedule import aget_promo_timeline, get_promo_timeline
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+class MenuSnapshot:
+    def __init__(self, version, expires_at, items):
+        self.version = version
+        self.expires_at = expires_at
+        self.items = tuple(items)
+        by_type = {}
+        for item in self.items:
+            by_type.setdefault(item.type, []).append(item)
+        self.by_type = MappingProxyType(
+            {key: tuple(value) for key, value in by_type.items()})
+        self.by_pk = MappingProxyType({str(item.pk): item for item in self.items})
+
+    def is_fresh(self, version, now):
+        return self.version == version and now < self.expires_at
+
+    def get(self, pk):
+        return self.by_pk.get(str(pk))
+
+    def filter(self, item_type=None, popular=False):
+        if item_type and item_type != 'all':
+            items = self.by_type.get(item_type, ())
+        else:
+            items = self.items
+        if popular:
+            items = tuple(item for item in items if item.is_popular)
+        return items
+
+
+def active_items():
+    return MenuItem.objects.filter(is_active=True).order_by('sort_order', 'name')
+
+
+def make_snapshot(version, now, timeline, items):
+    discounts = timeline.discounts(now.date())
+    # Скидки берутся из расписания акций, без запросов на каждую позицию
+    for item in items:
+        menu_promo = discounts.get(item.pk)
+        item.prefetched_promos = [menu_promo] if menu_promo else []
+    return MenuSnapshot(version, timeline.next_boundary(now), items)
+
+
+def build_snapshot(version, now):
+    return make_snapshot(version, now, get_promo_timeline(version), list(active_items()))
+
+
+async def abuild_snapshot(version, now):
+    timeline = await aget_promo_timeline(version)
+    return make_snapshot(version, now, timeline, [item async for item in active_items()])
+
+
+def get_menu_snapshot():
+    global _snapshot
+    version = get_version()
+    now = timezone.now()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.is_fresh(version, now):
+        return snapshot
+    with _lock:
+        snapshot = _snapshot
+        if snapshot is None or not snapshot.is_fresh(version, now):
+            snapshot = build_snapshot(version, now)
+            _snapshot = snapshot
+    return snapshot
+
+
+async def aget_menu_snapshot():
+    global _snapshot
+    version = await aget_version()
+    now = timezone.now()
+    snapshot = _snapshot
+    if snapshot is None or not snapshot.is_fresh(version, now):
+        snapshot = await abuild_snapshot(version, now)
+        _snapshot = snapshot
+    return snapshot
@@ -0,0 +1,239 @@
+import glob
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+# Метрики в формате Prometheus. Каждый процесс пишет свои значения в собственный
+# mmap-файл в METRICS_DIR, /metrics суммирует файлы всех процессов.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    'http_requests_total': ('counter', 'Количество HTTP-запросов'),
+    'http_request_duration_seconds': ('histogram', 'Время обработки HTTP-запроса'),
+    'db_queries_total': ('counter', 'Количество SQL-запросов'),
+    'db_query_duration_seconds_total': ('counter', 'Суммарное время SQL-запросов'),
+    'cache_requests_total': ('counter', 'Обращения к кэшу по результату'),
+    'bookings_created_total': ('counter', 'Созданные бронирования'),
+    'booking_status_transitions_total': ('counter', 'Смены статуса бронирований'),
+    'logins_total': ('counter', 'Попытки входа по источнику и результату'),
+    'throttled_total': ('counter', 'Отклонённые ограничителем попытки'),
+}
+
+HEADER = struct.Struct('<I')
+ENTRY = struct.Struct('<I')
+VALUE = struct.Struct('<d')
+INITIAL_SIZE = 64 * 1024
+
+
+def _align(size):
+    return (size + 7) // 8 * 8
+
+
+def sample_key(name, labels):
+    if not labels:
+        return name
+    body = ','.join('{}="{}"'.format(key, str(value).replace('\\', r'\\').replace('"', r'\"'))
+                    for key, value in sorted(labels.items(), key=lambda item: (item[0] == 'le', item[0])))
+    return f'{name}{{{body}}}'
+
+
+def read_file(path):
+    # Формат файла: [использовано байт] затем записи [длина ключа][ключ][float64]
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    if len(data) < HEADER.size:
+        return
+    used = HEADER.unpack_from(data, 0)[0]
+    offset = 8
+    while offset < used:
+        length = ENTRY.unpack_from(data, offset)[0]
+        key_start = offset + ENTRY.size
+        key = data[key_start:key_start + length].decode('utf-8')
+        value_offset = _align(key_start + length)
+        yield key, VALUE.unpack_from(data, value_offset)[0]
+        offset = value_offset + VALUE.size
+
+
+class ProcessValues:
+    def __init__(self, directory):
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.positions = {}
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f'metrics_{self.pid}.db')
+        # При повторном pid продолжаем с уже записанных значений
+        self.file = open(self.path, 'a+b')
+        if os.fstat(self.file.fileno()).st_size == 0:
+            self.file.truncate(INITIAL_SIZE)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.used = HEADER.unpack_from(self.map, 0)[0] or 8
+        self._index()
+
+    def _index(self):
+        offset = 8
+        while offset < self.used:
+            length = ENTRY.unpack_from(self.map, offset)[0]
+            key_start = offset + ENTRY.size
+            key = bytes(self.map[key_start:key_start + length]).decode('utf-8')
+            value_offset = _align(key_start + length)
+            self.positions[key] = value_offset
+            offset = value_offset + VALUE.size
+
+    def _add_entry(self, key):
+        encoded = key.encode('utf-8')
+        key_start = self.used + ENTRY.size
+        value_offset = _align(key_start + len(encoded))
+        end = value_offset + VALUE.size
+        if end > len(self.map):
+            size = max(len(self.map) * 2, end)
+            self.map.close()
+            self.file.truncate(size)
+            self.map = mmap.mmap(self.file.fileno(), 0)
+        ENTRY.pack_into(self.map, self.used, len(encoded))
+        self.map[key_start:key_start + len(encoded)] = encoded
+        VALUE.pack_into(self.map, value_offset, 0.0)
+        self.used = end
+        HEADER.pack_into(self.map, 0, self.used)
+        self.positions[key] = value_offset
+        return value_offset
+
+    def inc(self, key, amount=1.0):
+        with self.lock:
+            offset = self.positions.get(key)
+            if offset is None:
+                offset = self._add_entry(key)
+            VALUE.pack_into(self.map, offset, VALUE.unpack_from(self.map, offset)[0] + amount)
+
+
+_values = None
+_values_lock = threading.Lock()
+
+
+def _process_values():
+    global _values
+    values = _values
+    # После fork у дочернего процесса должен быть свой файл
+    if values is None or values.pid != os.getpid():
+        with _values_lock:
+            if _values is None or _values.pid != os.getpid():
+                _values = ProcessValues(settings.METRICS_DIR)
+            values = _values
+    return values
+
+
+def inc(name, amount=1.0, **labels):
+    _process_values().inc(sample_key(name, labels), amount)
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    values = _process_values()
+    for bound in buckets:
+        if value <= bound:
+            values.inc(sample_key(f'{name}_bucket', dict(labels, le=bound)))
+    values.inc(sample_key(f'{name}_bucket', dict(labels, le='+Inf')))
+    values.inc(sample_key(f'{name}_sum', labels), value)
+    values.inc(sample_key(f'{name}_count', labels))
+
+
+def collect():
+    totals = defaultdict(float)
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, 'metrics_*.db')):
+        for key, value in read_file(path):
+            totals[key] += value
+    return totals
+
+
+def _family(key):
+    name = key.split('{', 1)[0]
+    for suffix in ('_bucket', '_sum', '_count'):
+        base = name[:-len(suffix)]
+        if name.endswith(suffix) and METRICS.get(base, ('',))[0] == 'histogram':
+            return base
+    return name
+
+
+def _bucket_order(key):
+    # Корзины гистограммы выводятся по возрастанию границы, +Inf последней
+    if '_bucket{' not in key:
+        return (key, 0.0)
+    labels, _, bound = key.rpartition('le="')
+    bound = bound.rstrip('"}')
+    return (labels, float('inf') if bound == '+Inf' else float(bound))
+
+
+def gauges():
+    from django.db.models import Count
+    from django.utils import timezone
+
+    from .models import Job
+
+    samples = {}
+    counts = dict(Job.objects.values_list('status').annotate(total=Count('id')))
+    for status, _ in Job.STATUS_CHOICES:
+        samples[sample_key('job_queue_depth', {'status': status})] = counts.get(status, 0)
+    samples['job_queue_ready'] = Job.objects.filter(
+        status='queued', run_at__lte=timezone.now()).count()
+
+    totals = collect()
+    hits = sum(value for key, value in totals.items()
+               if key.startswith('cache_requests_total') and 'result="hit"' in key)
+    misses = sum(value for key, value in totals.items()
+                 if key.startswith('cache_requests_total') and 'result="miss"' in key)
+    samples['cache_hit_ratio'] = hits / (hits + misses) if hits + misses else 0.0
+    return totals, samples
+
+
+GAUGES = {
+    'job_queue_depth': 'Задачи в очереди по статусу',
+    'job_queue_ready': 'Задачи, готовые к выполнению',
+    'cache_hit_ratio': 'Доля попаданий в кэш',
+}
+
+
+def _format(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def record_request(request, response, request_metrics, total):
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match else 'unmatched'
+    inc('http_requests_total', view=view, method=request.method, status=response.status_code)
+    observe('http_request_duration_seconds', total, view=view, method=request.method)
+    if request_metrics.sql_count:
+        inc('db_queries_total', request_metrics.sql_count, view=view)
+        inc('db_query_duration_seconds_total', request_metrics.sql_time, view=view)
+    if request_metrics.cache_hits:
+        inc('cache_requests_total', request_metrics.cache_hits, result='hit')
+    if request_metrics.cache_misses:
+        inc('cache_requests_total', request_metrics.cache_misses, result='miss')
+
+
+def record_login(source, success):
+    inc('logins_total', source=source, result='success' if success else 'failure')
+
+
+def render():
+    totals, samples = gauges()
+    families = defaultdict(list)
+    for key, value in totals.items():
+        families[_family(key)].append((key, value))
+
+    lines = []
+    for name in sorted(families):
+        kind, help_text = METRICS.get(name, ('untyped', ''))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key, value in sorted(families[name], key=lambda item: _bucket_order(item[0])):
+            lines.append(f'{key} {_format(value)}')
+    for name, help_text in GAUGES.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        for key, value in sorted(samples.items()):
+            if key.split('{', 1)[0] == name:
+                lines.append(f'{key} {_format(value)}')
+    return '\n'.join(lines) + '\n'
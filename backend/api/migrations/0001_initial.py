@@ -0,0 +1,124 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:38
+
+import django.contrib.auth.models
+import django.contrib.auth.validators
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='Название')),
+                ('type', models.CharField(choices=[('coffee', 'Кофе'), ('tea', 'Чай'), ('desserts', 'Десерты'), ('breakfast', 'Завтраки')], default='coffee', max_length=20, verbose_name='Тип')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Описание')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена')),
+                ('image', models.ImageField(blank=True, null=True, upload_to='menu_images/', verbose_name='Изображение')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
+                ('sort_order', models.IntegerField(default=0, verbose_name='Порядок сортировки')),
+                ('is_popular', models.BooleanField(default=False, verbose_name='Популярное')),
+            ],
+            options={
+                'verbose_name': 'Позиция меню',
+                'verbose_name_plural': 'Позиции меню',
+                'db_table': 'menu',
+                'ordering': ['sort_order', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Promo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='Заголовок')),
+                ('description', models.TextField(verbose_name='Описание')),
+                ('image', models.ImageField(blank=True, null=True, upload_to='promo_images/', verbose_name='Изображение')),
+                ('start_date', models.DateField(verbose_name='Дата начала')),
+                ('end_date', models.DateField(verbose_name='Дата окончания')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Акция',
+                'verbose_name_plural': 'Акции',
+                'db_table': 'promo',
+            },
+        ),
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('username', models.CharField(error_messages={'unique': 'A user with that username already exists.'}, help_text='Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.', max_length=150, unique=True, validators=[django.contrib.auth.validators.UnicodeUsernameValidator()], verbose_name='username')),
+                ('first_name', models.CharField(blank=True, max_length=150, verbose_name='first name')),
+                ('last_name', models.CharField(blank=True, max_length=150, verbose_name='last name')),
+                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+                ('email', models.EmailField(max_length=254, unique=True, verbose_name='Email')),
+                ('phone', models.CharField(blank=True, max_length=20, validators=[django.core.validators.RegexValidator(message='Введите корректный номер телефона', regex='^[\\d\\s\\-\\+\\(\\)]{7,20}$')], verbose_name='Телефон')),
+                ('role', models.CharField(default='user', max_length=20, verbose_name='Роль')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата создания')),
+                ('groups', models.ManyToManyField(blank=True, help_text='Группы, к которым принадлежит пользователь', related_name='custom_user_groups', related_query_name='user', to='auth.group', verbose_name='Группы')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.permission', verbose_name='user permissions')),
+            ],
+            options={
+                'verbose_name': 'Пользователь',
+                'verbose_name_plural': 'Пользователи',
+            },
+            managers=[
+                ('objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Booking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(default='Гость', max_length=100, verbose_name='Имя')),
+                ('phone', models.CharField(default='не указан', max_length=20, verbose_name='Телефон')),
+                ('email', models.EmailField(default='guest@test.com', max_length=254, verbose_name='Email')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('time', models.TimeField(verbose_name='Время')),
+                ('persons', models.IntegerField(verbose_name='Количество персон')),
+                ('status', models.CharField(choices=[('new', 'Новая'), ('confirmed', 'Подтверждена'), ('cancelled', 'Отменена'), ('completed', 'Завершена')], default='new', max_length=50, verbose_name='Статус')),
+                ('comment', models.TextField(blank=True, null=True, verbose_name='Комментарий')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата создания')),
+                ('user', models.ForeignKey(blank=True, db_column='user_id', null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Бронирование',
+                'verbose_name_plural': 'Бронирования',
+                'db_table': 'bookings',
+            },
+        ),
+        migrations.CreateModel(
+            name='MenuPromo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('discount_percent', models.IntegerField(default=0, verbose_name='Процент скидки')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата создания')),
+                ('menu_item', models.ForeignKey(db_column='menu_id', on_delete=django.db.models.deletion.CASCADE, to='api.menuitem')),
+                ('promo', models.ForeignKey(db_column='promo_id', on_delete=django.db.models.deletion.CASCADE, to='api.promo')),
+            ],
+            options={
+                'verbose_name': 'Меню-Акция',
+                'verbose_name_plural': 'Меню-Акции',
+                'db_table': 'menu_promo',
+                'unique_together': {('menu_item', 'promo')},
+            },
+        ),
+    ]
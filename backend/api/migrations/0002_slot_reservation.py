@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:38
+
+from collections import defaultdict
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def fill_reservations(apps, schema_editor):
+    # Счётчики для уже существующих броней на сегодня и дальше, иначе проверка
+    # мест их не видит до ручного запуска rebuild_reservations
+    from api.availability import ACTIVE_STATUSES, DayAvailability, slot_time
+
+    Booking = apps.get_model('api', 'Booking')
+    SlotReservation = apps.get_model('api', 'SlotReservation')
+    days = defaultdict(list)
+    rows = Booking.objects.filter(
+        date__gte=django.utils.timezone.localdate(), status__in=ACTIVE_STATUSES
+    ).values_list('date', 'time', 'persons')
+    for day, booking_time, persons in rows:
+        days[day].append((booking_time, persons))
+    SlotReservation.objects.bulk_create([
+        SlotReservation(date=day, time=slot_time(index), persons=persons)
+        for day, bookings in days.items()
+        for index, persons in enumerate(DayAvailability.from_bookings(day, bookings).occupancy)
+        if persons
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('time', models.TimeField(verbose_name='Время слота')),
+                ('persons', models.IntegerField(default=0, verbose_name='Занято мест')),
+            ],
+            options={
+                'verbose_name': 'Занятость слота',
+                'verbose_name_plural': 'Занятость слотов',
+                'db_table': 'slot_reservation',
+                'unique_together': {('date', 'time')},
+            },
+        ),
+        migrations.RunPython(fill_reservations, migrations.RunPython.noop),
+    ]
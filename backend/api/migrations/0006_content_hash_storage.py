@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:38
+
+import api.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='menuitem',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=api.storage.ContentHashStorage(), upload_to='menu_images/', verbose_name='Изображение'),
+        ),
+        migrations.AlterField(
+            model_name='promo',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=api.storage.ContentHashStorage(), upload_to='promo_images/', verbose_name='Изображение'),
+        ),
+    ]
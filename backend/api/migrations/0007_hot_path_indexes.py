@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_content_hash_storage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', '-date', '-time'], name='booking_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='booking_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['-created_at', '-id'], name='booking_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status__in', ['new', 'confirmed'])), fields=['date', 'time'], name='booking_active_slot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['sort_order', 'name'], name='menu_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['type', 'sort_order', 'name'], name='menu_type_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['sort_order', 'name'], name='menu_active_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['type', 'sort_order', 'name'], name='menu_active_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_popular', True)), fields=['sort_order', 'name'], name='menu_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='promo',
+            index=models.Index(fields=['-start_date'], name='promo_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='promo',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['end_date', 'start_date'], name='promo_active_end_idx'),
+        ),
+    ]
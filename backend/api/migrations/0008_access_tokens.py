@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:48
+
+from datetime import timedelta
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_legacy_tokens(apps, schema_editor):
+    # Бессрочные токены authtoken переносятся с обычным сроком жизни
+    Token = apps.get_model('authtoken', 'Token')
+    AccessToken = apps.get_model('api', 'AccessToken')
+    expires_at = django.utils.timezone.now() + timedelta(seconds=settings.TOKEN_TTL)
+    AccessToken.objects.bulk_create([
+        AccessToken(key=token.key, user_id=token.user_id, created_at=token.created,
+                    expires_at=expires_at)
+        for token in Token.objects.all()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_hot_path_indexes'),
+        ('authtoken', '0004_alter_tokenproxy_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessToken',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False, verbose_name='Ключ')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата создания')),
+                ('expires_at', models.DateTimeField(verbose_name='Действует до')),
+                ('last_used_at', models.DateTimeField(blank=True, null=True, verbose_name='Последнее использование')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access_tokens', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Токен доступа',
+                'verbose_name_plural': 'Токены доступа',
+                'db_table': 'access_token',
+                'indexes': [models.Index(fields=['expires_at'], name='access_token_expires_idx'), models.Index(fields=['user', '-created_at'], name='access_token_user_idx')],
+            },
+        ),
+        migrations.RunPython(copy_legacy_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:27
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_access_tokens'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='persons',
+            field=models.IntegerField(validators=[django.core.validators.MinValueValidator(1)], verbose_name='Количество персон'),
+        ),
+    ]
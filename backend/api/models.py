@@ -1,8 +1,17 @@
-from django.db import models
+import hashlib
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
 from django.utils import timezone
-from django.core.validators import RegexValidator
+from django.utils.functional import cached_property
+from django.core.validators import MinValueValidator, RegexValidator
 from django.contrib.auth.models import AbstractUser, Group
 
+from .images import srcset, variant_url
+from .storage import content_storage
+
 
 class User(AbstractUser):
     email = models.EmailField('Email', unique=True)
@@ -31,11 +40,34 @@ class User(AbstractUser):
         return name if name else self.email
 
     class Meta:
+        indexes = [
+            # Порядок курсорной пагинации /api/users/
+            models.Index(fields=['-created_at', '-id'], name='user_created_idx'),
+        ]
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
 
 
-class MenuItem(models.Model):
+class ResponsiveImageMixin:
+    def image_srcset(self, fmt='webp'):
+        return srcset(self.image, self.image_variants, fmt)
+
+    def image_variant_url(self, width, fmt='webp'):
+        if self.image:
+            return variant_url(self.image, self.image_variants, width, fmt)
+
+
+class MenuItemQuerySet(models.QuerySet):
+    def with_current_promos(self, day=None):
+        # Акции на день подтягиваются одним запросом на весь queryset
+        return self.prefetch_related(models.Prefetch(
+            'menupromo_set',
+            queryset=MenuPromo.objects.current(day).select_related('promo').order_by('pk'),
+            to_attr='prefetched_promos'
+        ))
+
+
+class MenuItem(ResponsiveImageMixin, models.Model):
     TYPE_CHOICES = [
         ('coffee', 'Кофе'),
         ('tea', 'Чай'),
@@ -49,14 +81,31 @@ class MenuItem(models.Model):
     description = models.TextField('Описание', blank=True, null=True)
     price = models.DecimalField('Цена', max_digits=10, decimal_places=2)
     image = models.ImageField(
-        'Изображение', upload_to='menu_images/', blank=True, null=True)
+        'Изображение', upload_to='menu_images/', storage=content_storage,
+        blank=True, null=True)
+    image_variants = models.JSONField(
+        'Варианты изображения', default=dict, blank=True, editable=False)
     is_active = models.BooleanField('Активно', default=True)
     sort_order = models.IntegerField('Порядок сортировки', default=0)
     is_popular = models.BooleanField('Популярное', default=False)
 
+    objects = MenuItemQuerySet.as_manager()
+
     class Meta:
         db_table = 'menu'
         ordering = ['sort_order', 'name']
+        indexes = [
+            models.Index(fields=['sort_order', 'name'], name='menu_order_idx'),
+            models.Index(fields=['type', 'sort_order', 'name'], name='menu_type_order_idx'),
+            # Публичное меню: только активные позиции
+            models.Index(fields=['sort_order', 'name'], condition=models.Q(is_active=True),
+                         name='menu_active_order_idx'),
+            models.Index(fields=['type', 'sort_order', 'name'], condition=models.Q(is_active=True),
+                         name='menu_active_type_idx'),
+            models.Index(fields=['sort_order', 'name'],
+                         condition=models.Q(is_active=True, is_popular=True),
+                         name='menu_popular_idx'),
+        ]
         verbose_name = 'Позиция меню'
         verbose_name_plural = 'Позиции меню'
 
@@ -68,19 +117,28 @@ class MenuItem(models.Model):
         if self.image and hasattr(self.image, 'url'):
             return self.image.url
 
+    @property
+    def card_image_url(self):
+        return self.image_variant_url(640)
+
     def get_current_promos(self):
-        today = timezone.now().date()
-        return MenuPromo.objects.filter(
-            menu_item=self,
-            promo__start_date__lte=today,
-            promo__end_date__gte=today,
-            promo__is_active=True
-        )
+        return MenuPromo.objects.current().filter(menu_item=self)
 
-    @property
+    @cached_property
     def current_promo(self):
-        promos = self.get_current_promos()
-        return promos.first() if promos.exists() else None
+        if hasattr(self, 'prefetched_promos'):
+            return self.prefetched_promos[0] if self.prefetched_promos else None
+        from .promo_schedule import get_promo_timeline
+        return get_promo_timeline().discounts().get(self.pk)
+
+    @cached_property
+    def card_version(self):
+        # Ключ кэша карточки: меняется при правке позиции или её скидки
+        promo = self.current_promo
+        parts = (self.name, self.type, self.description, self.price, self.image.name,
+                 self.image_variants.get('hash'), self.is_popular,
+                 promo.pk if promo else None, self.discount_percent)
+        return hashlib.md5(repr(parts).encode()).hexdigest()
 
     @property
     def discount_price(self):
@@ -105,11 +163,14 @@ class MenuItem(models.Model):
         return 0
 
 
-class Promo(models.Model):
+class Promo(ResponsiveImageMixin, models.Model):
     title = models.CharField('Заголовок', max_length=200)
     description = models.TextField('Описание')
     image = models.ImageField(
-        'Изображение', upload_to='promo_images/', blank=True, null=True)
+        'Изображение', upload_to='promo_images/', storage=content_storage,
+        blank=True, null=True)
+    image_variants = models.JSONField(
+        'Варианты изображения', default=dict, blank=True, editable=False)
     start_date = models.DateField('Дата начала')
     end_date = models.DateField('Дата окончания')
     is_active = models.BooleanField('Активно', default=True)
@@ -117,6 +178,11 @@ class Promo(models.Model):
 
     class Meta:
         db_table = 'promo'
+        indexes = [
+            models.Index(fields=['-start_date'], name='promo_start_idx'),
+            models.Index(fields=['end_date', 'start_date'], condition=models.Q(is_active=True),
+                         name='promo_active_end_idx'),
+        ]
         verbose_name = 'Акция'
         verbose_name_plural = 'Акции'
 
@@ -131,6 +197,12 @@ class Booking(models.Model):
         ('cancelled', 'Отменена'),
         ('completed', 'Завершена'),
     ]
+    STATUS_TRANSITIONS = {
+        'new': ('confirmed', 'cancelled'),
+        'confirmed': ('completed', 'cancelled'),
+        'cancelled': (),
+        'completed': (),
+    }
 
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, db_column='user_id', null=True, blank=True)
@@ -139,7 +211,7 @@ class Booking(models.Model):
     email = models.EmailField('Email', default='guest@test.com')
     date = models.DateField('Дата')
     time = models.TimeField('Время')
-    persons = models.IntegerField('Количество персон')
+    persons = models.IntegerField('Количество персон', validators=[MinValueValidator(1)])
     status = models.CharField('Статус', max_length=50,
                               choices=STATUS_CHOICES, default='new')
     comment = models.TextField('Комментарий', blank=True, null=True)
@@ -147,12 +219,162 @@ class Booking(models.Model):
 
     class Meta:
         db_table = 'bookings'
+        indexes = [
+            models.Index(fields=['user', '-date', '-time'], name='booking_user_date_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='booking_user_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='booking_created_idx'),
+            # Занятость слотов считается только по действующим броням
+            models.Index(fields=['date', 'time'],
+                         condition=models.Q(status__in=['new', 'confirmed']),
+                         name='booking_active_slot_idx'),
+        ]
         verbose_name = 'Бронирование'
         verbose_name_plural = 'Бронирования'
 
     def __str__(self):
         return f"Бронь #{self.id} - {self.name}"
 
+    def can_transition_to(self, status):
+        return status == self.status or status in self.STATUS_TRANSITIONS.get(self.status, ())
+
+    def save(self, *args, **kwargs):
+        from .reservations import sync_booking
+        with transaction.atomic():
+            sync_booking(self)
+            super().save(*args, **kwargs)
+
+
+class SlotReservation(models.Model):
+    date = models.DateField('Дата')
+    time = models.TimeField('Время слота')
+    persons = models.IntegerField('Занято мест', default=0)
+
+    class Meta:
+        db_table = 'slot_reservation'
+        unique_together = ['date', 'time']
+        verbose_name = 'Занятость слота'
+        verbose_name_plural = 'Занятость слотов'
+
+    def __str__(self):
+        return f"{self.date} {self.time:%H:%M} - {self.persons}"
+
+
+class IdempotencyKey(models.Model):
+    key = models.CharField('Ключ', max_length=255)
+    scope = models.CharField('Область', max_length=255)
+    fingerprint = models.CharField('Отпечаток запроса', max_length=64)
+    status_code = models.IntegerField('Код ответа', null=True, blank=True)
+    response_body = models.TextField('Тело ответа', blank=True)
+    created_at = models.DateTimeField('Дата создания', default=timezone.now)
+    expires_at = models.DateTimeField('Действует до')
+
+    class Meta:
+        db_table = 'idempotency_key'
+        unique_together = ['key', 'scope']
+        verbose_name = 'Ключ идемпотентности'
+        verbose_name_plural = 'Ключи идемпотентности'
+
+    def __str__(self):
+        return f"{self.scope} - {self.key}"
+
+
+class AccessTokenQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+
+class AccessToken(models.Model):
+    key = models.CharField('Ключ', max_length=40, primary_key=True)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='access_tokens',
+        verbose_name='Пользователь')
+    created_at = models.DateTimeField('Дата создания', default=timezone.now)
+    expires_at = models.DateTimeField('Действует до')
+    last_used_at = models.DateTimeField('Последнее использование', null=True, blank=True)
+
+    objects = AccessTokenQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'access_token'
+        indexes = [
+            models.Index(fields=['expires_at'], name='access_token_expires_idx'),
+            models.Index(fields=['user', '-created_at'], name='access_token_user_idx'),
+        ]
+        verbose_name = 'Токен доступа'
+        verbose_name_plural = 'Токены доступа'
+
+    def __str__(self):
+        return f"{self.user} - {self.key[:8]}…"
+
+    @classmethod
+    def issue(cls, user):
+        # Новый токен на каждый вход; старые сверх лимита удаляются
+        token = cls.objects.create(
+            user=user, key=secrets.token_hex(20),
+            expires_at=timezone.now() + timedelta(seconds=settings.TOKEN_TTL))
+        stale = cls.objects.filter(user=user).order_by('-created_at').values_list(
+            'key', flat=True)[settings.TOKEN_MAX_PER_USER:]
+        if stale:
+            cls.objects.filter(key__in=list(stale)).delete()
+        return token
+
+    def rotate(self):
+        with transaction.atomic():
+            token = AccessToken.issue(self.user)
+            self.delete()
+        return token
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('failed', 'Ошибка'),
+    ]
+
+    name = models.CharField('Задача', max_length=200)
+    payload = models.JSONField('Параметры', default=dict, blank=True)
+    key = models.CharField('Ключ дедупликации', max_length=255, blank=True, null=True)
+    status = models.CharField('Статус', max_length=20,
+                              choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField('Попыток', default=0)
+    max_attempts = models.IntegerField('Максимум попыток', default=5)
+    run_at = models.DateTimeField('Запустить после', default=timezone.now)
+    locked_at = models.DateTimeField('Взята в работу', null=True, blank=True)
+    locked_by = models.CharField('Обработчик', max_length=100, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Дата создания', default=timezone.now)
+
+    class Meta:
+        db_table = 'job'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'], condition=models.Q(status__in=['queued', 'running']),
+                name='job_pending_key_unique'),
+        ]
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+
+    def __str__(self):
+        return f"{self.name} #{self.id}"
+
+
+class MenuPromoQuerySet(models.QuerySet):
+    def current(self, day=None):
+        day = day or timezone.now().date()
+        return self.filter(
+            promo__start_date__lte=day,
+            promo__end_date__gte=day,
+            promo__is_active=True
+        )
+
 
 class MenuPromo(models.Model):
     menu_item = models.ForeignKey(
@@ -162,6 +384,8 @@ class MenuPromo(models.Model):
     discount_percent = models.IntegerField('Процент скидки', default=0)
     created_at = models.DateTimeField('Дата создания', default=timezone.now)
 
+    objects = MenuPromoQuerySet.as_manager()
+
     class Meta:
         db_table = 'menu_promo'
         unique_together = ['menu_item', 'promo']
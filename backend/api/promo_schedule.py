@@ -0,0 +1,119 @@
+import threading
+from bisect import bisect_right
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from types import MappingProxyType
+
+from django.utils import timezone
+
+from .content_version import aget_version, get_version
+from .models import Promo, MenuPromo
+
+_lock = threading.Lock()
+_timeline = None
+
+
+class PromoTimeline:
+    def __init__(self, version, since, promos, menu_promos):
+        self.version = version
+        self.since = since
+        # Акции в порядке вывода на сайте: сначала новые
+        self.promos = tuple(sorted(promos, key=lambda p: (p.start_date, p.pk), reverse=True))
+
+        links = {}
+        for menu_promo in sorted(menu_promos, key=lambda mp: mp.pk):
+            links.setdefault(menu_promo.promo_id, []).append(menu_promo)
+
+        # Границы интервалов: начало акции и день после её окончания
+        bounds = set()
+        for promo in self.promos:
+            bounds.add(promo.start_date)
+            bounds.add(promo.end_date + timedelta(days=1))
+        self.boundaries = tuple(sorted(bounds))
+
+        # Для каждого отрезка между границами — активные акции и скидки
+        self.segments = []
+        for start in (since,) + self.boundaries:
+            active = tuple(p for p in self.promos
+                           if p.start_date <= start <= p.end_date)
+            discounts = {}
+            for menu_promo in sorted(
+                    (mp for p in active for mp in links.get(p.pk, ())),
+                    key=lambda mp: mp.pk):
+                discounts.setdefault(menu_promo.menu_item_id, menu_promo)
+            self.segments.append((active, MappingProxyType(discounts)))
+
+    def _segment(self, day):
+        return self.segments[bisect_right(self.boundaries, day)]
+
+    def active(self, day=None):
+        return self._segment(day or timezone.now().date())[0]
+
+    def discounts(self, day=None):
+        return self._segment(day or timezone.now().date())[1]
+
+    def visible(self, day=None):
+        day = day or timezone.now().date()
+        return tuple(p for p in self.promos if p.end_date >= day)
+
+    def window_start(self, now=None):
+        now = now or timezone.now()
+        index = bisect_right(self.boundaries, now.date())
+        day = self.boundaries[index - 1] if index else self.since
+        return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+    def next_boundary(self, now=None):
+        now = now or timezone.now()
+        index = bisect_right(self.boundaries, now.date())
+        if index == len(self.boundaries):
+            # Расписание не меняется, но дата в ключах кэшей сменится в полночь
+            day = now.date() + timedelta(days=1)
+        else:
+            day = self.boundaries[index]
+        return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+    def seconds_until_change(self, now=None):
+        now = now or timezone.now()
+        return max(1, int((self.next_boundary(now) - now).total_seconds()) + 1)
+
+
+def build_timeline(version, since):
+    promos = list(Promo.objects.filter(is_active=True, end_date__gte=since))
+    menu_promos = MenuPromo.objects.filter(
+        promo__in=[p.pk for p in promos]).select_related('promo')
+    return PromoTimeline(version, since, promos, menu_promos)
+
+
+def get_promo_timeline(version=None):
+    global _timeline
+    if version is None:
+        version = get_version()
+    today = timezone.now().date()
+    timeline = _timeline
+    if timeline is not None and timeline.version == version and timeline.since <= today:
+        return timeline
+    with _lock:
+        timeline = _timeline
+        if timeline is None or timeline.version != version or timeline.since > today:
+            timeline = build_timeline(version, today)
+            _timeline = timeline
+    return timeline
+
+
+async def abuild_timeline(version, since):
+    promos = [promo async for promo in Promo.objects.filter(is_active=True, end_date__gte=since)]
+    menu_promos = [menu_promo async for menu_promo in MenuPromo.objects.filter(
+        promo__in=[p.pk for p in promos]).select_related('promo')]
+    return PromoTimeline(version, since, promos, menu_promos)
+
+
+async def aget_promo_timeline(version=None):
+    # Общий с синхронной версией кэш; при гонке расписание просто строится дважды
+    global _timeline
+    if version is None:
+        version = await aget_version()
+    today = timezone.now().date()
+    timeline = _timeline
+    if timeline is None or timeline.version != version or timeline.since > today:
+        timeline = await abuild_timeline(version, today)
+        _timeline = timeline
+    return timeline
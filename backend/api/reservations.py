@@ -0,0 +1,94 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .availability import ACTIVE_STATUSES, DayAvailability, invalidate_day, slot_time
+from .models import Booking, SlotReservation
+
+
+class SlotUnavailable(Exception):
+    pass
+
+
+def _slots(day, booking_time):
+    start, end = DayAvailability.span(booking_time)
+    return [slot_time(index) for index in range(start, end)]
+
+
+def reserve(day, booking_time, persons, strict=True):
+    # Отрицательное число уменьшило бы счётчики и обошло проверку мест
+    if persons < 1:
+        raise ValueError('Количество персон должно быть не меньше 1')
+    slots = _slots(day, booking_time)
+    if not slots:
+        if strict:
+            raise SlotUnavailable
+        return
+    SlotReservation.objects.bulk_create(
+        [SlotReservation(date=day, time=slot) for slot in slots], ignore_conflicts=True)
+    qs = SlotReservation.objects.filter(date=day, time__in=slots)
+    if strict:
+        # Условный UPDATE: счётчик растёт, только если в слоте хватает мест
+        qs = qs.filter(persons__lte=settings.BOOKING_CAPACITY - persons)
+    updated = qs.update(persons=F('persons') + persons)
+    if strict and updated != len(slots):
+        raise SlotUnavailable
+
+
+def release(day, booking_time, persons):
+    SlotReservation.objects.filter(
+        date=day, time__in=_slots(day, booking_time)
+    ).update(persons=F('persons') - persons)
+
+
+def release_many(bookings):
+    # Одно обновление на каждый затронутый слот, а не на каждую бронь
+    deltas = {}
+    for booking in bookings:
+        for slot in _slots(booking.date, booking.time):
+            deltas[booking.date, slot] = deltas.get((booking.date, slot), 0) + booking.persons
+    for (day, slot), persons in deltas.items():
+        SlotReservation.objects.filter(date=day, time=slot).update(persons=F('persons') - persons)
+
+
+def sync_booking(booking):
+    # Вызывается из Booking.save() внутри транзакции
+    if booking._state.adding or booking.pk is None:
+        previous = None
+    else:
+        previous = Booking.objects.filter(pk=booking.pk).values(
+            'date', 'time', 'persons', 'status').first()
+    booking._previous_date = previous['date'] if previous else None
+    booking._previous_status = previous['status'] if previous else None
+
+    opts = Booking._meta
+    booking.date = opts.get_field('date').to_python(booking.date)
+    booking.time = opts.get_field('time').to_python(booking.time)
+    current = {'date': booking.date, 'time': booking.time,
+               'persons': booking.persons, 'status': booking.status}
+    if previous == current:
+        return
+    if previous and previous['status'] in ACTIVE_STATUSES:
+        release(previous['date'], previous['time'], previous['persons'])
+    if booking.status in ACTIVE_STATUSES:
+        # Без проверки мест проходит только смена статуса внутри активных,
+        # например new -> confirmed: занятость слота при этом не меняется
+        unchanged = (previous is not None and previous['status'] in ACTIVE_STATUSES
+                     and all(previous[field] == current[field]
+                             for field in ('date', 'time', 'persons')))
+        reserve(booking.date, booking.time, booking.persons, strict=not unchanged)
+
+
+def rebuild(day):
+    with transaction.atomic():
+        SlotReservation.objects.filter(date=day).delete()
+        rows = Booking.objects.filter(
+            date=day, status__in=ACTIVE_STATUSES).values_list('time', 'persons')
+        availability = DayAvailability.from_bookings(day, rows)
+        SlotReservation.objects.bulk_create([
+            SlotReservation(date=day, time=slot_time(index), persons=persons)
+            for index, persons in enumerate(availability.occupancy) if persons
+        ])
+        transaction.on_commit(partial(invalidate_day, day))
@@ -0,0 +1,93 @@
+from django.db import connection
+
+from .stemming import stem, stem_text, tokenize
+
+TABLE = 'menu_search'
+MAX_RESULTS = 500
+# Вес совпадения в названии относительно описания для bm25
+NAME_WEIGHT = 5.0
+
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def ensure_index():
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+            "name, description, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+
+def index_item(item):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [item.pk])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, name, description) VALUES (%s, %s, %s)',
+            [item.pk, stem_text(item.name), stem_text(item.description)],
+        )
+
+
+def remove_item(pk):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [pk])
+
+
+def rebuild_index():
+    from .models import MenuItem
+
+    ensure_index()
+    rows = [
+        (pk, stem_text(name), stem_text(description))
+        for pk, name, description in MenuItem.objects.values_list('pk', 'name', 'description')
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, name, description) VALUES (%s, %s, %s)', rows)
+    return len(rows)
+
+
+def build_query(text):
+    # Каждое слово запроса — основа с префиксным поиском, слова объединяются через AND
+    terms = []
+    for token in tokenize(text):
+        base = stem(token)
+        if base:
+            terms.append('"%s"*' % base.replace('"', ''))
+    return ' '.join(terms)
+
+
+def search_ids(text, limit=MAX_RESULTS):
+    query = build_query(text)
+    if not query:
+        return []
+    if not is_supported():
+        from .models import MenuItem
+        from django.db.models import Q
+        qs = MenuItem.objects.all()
+        for token in tokenize(text):
+            qs = qs.filter(Q(name__icontains=token) | Q(description__icontains=token))
+        return list(qs.values_list('pk', flat=True)[:limit])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s '
+            f'ORDER BY bm25({TABLE}, %s, 1.0) LIMIT %s',
+            [query, NAME_WEIGHT, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def filter_items(items, text):
+    # Отбирает позиции из уже загруженного списка в порядке релевантности
+    ranks = {pk: rank for rank, pk in enumerate(search_ids(text))}
+    found = [item for item in items if item.pk in ranks]
+    found.sort(key=lambda item: ranks[item.pk])
+    return tuple(found)
@@ -1,29 +1,54 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import authenticate
+from .instrumentation import TimedListSerializer, TimedSerializerMixin
 from .models import User, MenuItem, Promo, Booking, MenuPromo
 
 
-class UserSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    # ?fields=id,price — отдаются только перечисленные поля
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        fields = request.query_params.get('fields')
+        if fields:
+            allowed = {name.strip() for name in fields.split(',')}
+            for name in set(self.fields) - allowed:
+                self.fields.pop(name)
+
+
+class UserSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
+        list_serializer_class = TimedListSerializer
         fields = ('id', 'email', 'first_name', 'last_name', 'phone', 'role')
 
 
-class MenuItemSerializer(serializers.ModelSerializer):
+class MenuItemSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    has_discount = serializers.BooleanField(read_only=True)
+    discount_percent = serializers.IntegerField(read_only=True)
+    discount_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, read_only=True)
+
     class Meta:
         model = MenuItem
+        list_serializer_class = TimedListSerializer
         fields = '__all__'
 
 
-class PromoSerializer(serializers.ModelSerializer):
+class PromoSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Promo
+        list_serializer_class = TimedListSerializer
         fields = '__all__'
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Booking
+        list_serializer_class = TimedListSerializer
         fields = '__all__'
         read_only_fields = ('user', 'created_at', 'status')
 
@@ -34,12 +59,33 @@ class BookingSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class MenuPromoSerializer(serializers.ModelSerializer):
+class BookingStatusSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=Booking.STATUS_CHOICES)
+
+
+class BookingBulkSerializer(TimedSerializerMixin, serializers.Serializer):
+    create = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    update = BookingStatusSerializer(many=True, required=False, default=list)
+
+    def validate(self, attrs):
+        if len(attrs['create']) + len(attrs['update']) > settings.BOOKING_BULK_LIMIT:
+            raise serializers.ValidationError(
+                f'Не более {settings.BOOKING_BULK_LIMIT} операций за запрос')
+        return attrs
+
+
+class MenuPromoSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = MenuPromo
         fields = '__all__'
 
 
-class TokenSerializer(serializers.Serializer):
+class AvailabilitySerializer(TimedSerializerMixin, serializers.Serializer):
+    date = serializers.DateField()
+    persons = serializers.IntegerField(min_value=1, default=1)
+
+
+class TokenSerializer(TimedSerializerMixin, serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField()
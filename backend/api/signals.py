@@ -0,0 +1,96 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .authentication import invalidate_token, invalidate_user
+from .availability import ACTIVE_STATUSES, invalidate_day
+from .booking_events import publish_booking
+from .content_version import bump_version
+from .images import refresh_variants_task, variants_outdated
+from .jobs import enqueue
+from .metrics import inc
+from .models import AccessToken, MenuItem, Promo, MenuPromo, Booking, User
+from .reservations import release
+from .search import index_item, rebuild_index, remove_item
+
+
+@receiver([post_save, post_delete], sender=MenuItem)
+@receiver([post_save, post_delete], sender=Promo)
+@receiver([post_save, post_delete], sender=MenuPromo)
+def invalidate_menu(sender, **kwargs):
+    transaction.on_commit(bump_version)
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_save, sender=Promo)
+def build_image_variants(sender, instance, raw=False, **kwargs):
+    if not raw and variants_outdated(instance):
+        label = sender._meta.label
+        enqueue(refresh_variants_task, key=f'images:{label}:{instance.pk}',
+                model=label, pk=instance.pk)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Смена пароля, блокировка или удаление сразу видны всем запросам
+    invalidate_user(instance.pk)
+    transaction.on_commit(partial(invalidate_user, instance.pk))
+
+
+@receiver(post_delete, sender=AccessToken)
+def invalidate_cached_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+    transaction.on_commit(partial(invalidate_token, instance.key))
+
+
+@receiver(post_save, sender=MenuItem)
+def update_search_index(sender, instance, **kwargs):
+    index_item(instance)
+
+
+@receiver(post_delete, sender=MenuItem)
+def remove_from_search_index(sender, instance, **kwargs):
+    remove_item(instance.pk)
+
+
+def rebuild_search_index(sender, **kwargs):
+    rebuild_index()
+
+
+@receiver(post_delete, sender=Booking)
+def release_reservation(sender, instance, **kwargs):
+    if instance.status in ACTIVE_STATUSES:
+        release(instance.date, instance.time, instance.persons)
+
+
+@receiver(post_save, sender=Booking)
+def count_booking(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        transaction.on_commit(partial(inc, 'bookings_created_total'))
+        return
+    previous = getattr(instance, '_previous_status', None)
+    if previous and previous != instance.status:
+        transaction.on_commit(partial(
+            inc, 'booking_status_transitions_total', **{'from': previous, 'to': instance.status}))
+
+
+@receiver(post_save, sender=Booking)
+def publish_booking_event(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        transaction.on_commit(partial(publish_booking, instance))
+        return
+    previous = getattr(instance, '_previous_status', None)
+    if previous and previous != instance.status:
+        transaction.on_commit(partial(publish_booking, instance, previous))
+
+
+@receiver([post_save, post_delete], sender=Booking)
+def invalidate_availability(sender, instance, **kwargs):
+    for day in {instance.date, getattr(instance, '_previous_date', None)}:
+        transaction.on_commit(partial(invalidate_day, day))
@@ -0,0 +1,44 @@
+import hashlib
+import os
+import re
+
+from django.core.files.storage import FileSystemStorage
+from django.views.static import serve
+
+CONTENT_PREFIX = 'content'
+# Файлы, имя которых зависит от содержимого, никогда не меняются
+IMMUTABLE_NAME = re.compile(
+    rf'^{CONTENT_PREFIX}/|\.[0-9a-f]{{12}}\.\d+w\.\w+$')
+
+
+def content_name(content, original_name):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    hexdigest = digest.hexdigest()
+    ext = os.path.splitext(original_name)[1].lower()
+    return f'{CONTENT_PREFIX}/{hexdigest[:2]}/{hexdigest}{ext}'
+
+
+class ContentHashStorage(FileSystemStorage):
+    # Одинаковые файлы хранятся один раз: имя файла — хэш его содержимого
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        name = content_name(content, name)
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+
+content_storage = ContentHashStorage()
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    response = serve(request, path, document_root, show_indexes)
+    if IMMUTABLE_NAME.search(path):
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
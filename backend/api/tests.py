@@ -1,3 +1,987 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import platform
+import re
+import statistics
+import tempfile
+import time as clock
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time, timedelta
+from io import BytesIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.base import ContentFile
+from django.core.signals import request_finished
+from django.db import connection, connections, reset_queries
+from django.db.models import Max, Sum
+from django.test import TestCase, TransactionTestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from website.forms import BookingForm
+
+from .authentication import cache as auth_cache
+from .availability import get_day_availability
+from .booking_events import CREATED, broker
+from .checks import check_auth_cache, check_default_cache
+from .content_version import bump_version
+from .idempotency import _responses as idempotent_responses
+from .images import build_variants
+from .instrumentation import install, uninstall
+from .models import (AccessToken, Booking, IdempotencyKey, MenuItem, MenuPromo, Promo,
+                     SlotReservation, User)
+from .reservations import SlotUnavailable, rebuild, release, reserve
+from .search import search_ids
+from .storage import content_storage
+
+
+@override_settings(BOOKING_CAPACITY=20)
+class ConcurrentBookingTests(TransactionTestCase):
+    def book(self, day, booking_time, persons):
+        try:
+            Booking.objects.create(date=day, time=booking_time, persons=persons)
+            return True
+        except SlotUnavailable:
+            return False
+        finally:
+            connections.close_all()
+
+    def book_in_parallel(self, requests):
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            return list(pool.map(lambda args: self.book(*args), requests))
+
+    def test_slot_is_never_oversubscribed(self):
+        day = timezone.localdate() + timedelta(days=1)
+        results = self.book_in_parallel([(day, time(12, 0), 3)] * 300)
+
+        self.assertEqual(sum(results), 6)
+        booked = Booking.objects.filter(date=day).aggregate(total=Sum('persons'))['total']
+        self.assertEqual(booked, 18)
+        reserved = SlotReservation.objects.filter(date=day).aggregate(top=Max('persons'))['top']
+        self.assertEqual(reserved, 18)
+
+    def test_unrelated_slots_are_not_blocked(self):
+        day = timezone.localdate() + timedelta(days=1)
+        hot = [(day, time(12, 0), 2)] * 150
+        other = [(day + timedelta(days=offset), time(9, 0), 2) for offset in range(1, 151)]
+        results = self.book_in_parallel([pair for pairs in zip(hot, other) for pair in pairs])
+
+        self.assertEqual(sum(results[0::2]), 10)
+        self.assertTrue(all(results[1::2]))
+        self.assertEqual(Booking.objects.exclude(date=day).count(), 150)
+
+
+@override_settings(BOOKING_CAPACITY=4)
+class BookingCapacityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = timezone.localdate() + timedelta(days=1)
+        cls.user = User.objects.create_user(
+            username='guest', email='guest@example.com', password='secret-pass')
+        cls.staff = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='secret-pass')
+        cls.moved = Booking.objects.create(user=cls.user, date=cls.day, time=time(12, 0), persons=3)
+        Booking.objects.create(user=cls.user, date=cls.day, time=time(15, 0), persons=4)
+
+    def occupancy(self):
+        return dict(SlotReservation.objects.filter(date=self.day).values_list('time', 'persons'))
+
+    def test_update_into_full_slot_is_rejected(self):
+        before = self.occupancy()
+        self.client.force_login(self.user)
+        response = self.client.patch(f'/api/booking/{self.moved.pk}/', {'time': '15:00'},
+                                     content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('time', response.json())
+        self.moved.refresh_from_db()
+        self.assertEqual(self.moved.time, time(12, 0))
+        self.assertEqual(self.occupancy(), before)
+
+    def test_update_within_capacity_moves_reservation(self):
+        self.client.force_login(self.user)
+        response = self.client.patch(f'/api/booking/{self.moved.pk}/', {'time': '18:00'},
+                                     content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        occupancy = self.occupancy()
+        self.assertEqual(occupancy[time(12, 0)], 0)
+        self.assertEqual(occupancy[time(18, 0)], 3)
+
+    def test_status_change_does_not_recheck_capacity(self):
+        Booking.objects.filter(date=self.day, time=time(15, 0)).update(persons=5)
+        rebuild(self.day)
+        booking = Booking.objects.get(date=self.day, time=time(15, 0))
+        booking.status = 'confirmed'
+        booking.save()
+
+        self.assertEqual(self.occupancy()[time(15, 0)], 5)
+
+    def test_admin_reports_full_slot_as_form_error(self):
+        self.client.force_login(self.staff)
+        response = self.client.post(f'/admin/api/booking/{self.moved.pk}/change/', {
+            'name': 'Гость', 'phone': '+79990000000', 'email': 'guest@example.com',
+            'date': self.day.isoformat(), 'time': '15:00', 'persons': 3,
+            'status': 'new', 'created_at_0': self.day.isoformat(), 'created_at_1': '10:00',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('На это время нет свободных мест', response.content.decode())
+        self.moved.refresh_from_db()
+        self.assertEqual(self.moved.time, time(12, 0))
+
+    def test_rebuild_refreshes_cached_occupancy(self):
+        cache.clear()
+        self.assertEqual(get_day_availability(self.day).free_seats(time(15, 0)), 0)
+        Booking.objects.filter(date=self.day, time=time(15, 0)).update(status='cancelled')
+        with self.captureOnCommitCallbacks(execute=True):
+            rebuild(self.day)
+        self.assertEqual(get_day_availability(self.day).free_seats(time(15, 0)), 4)
+
+    def test_stale_occupancy_cache_does_not_veto_bookings(self):
+        cache.clear()
+        self.client.get('/api/booking/availability/', {'date': self.day.isoformat()})
+        # Отмена в другом процессе: счётчики в базе уже уменьшены, а кэш этого процесса нет
+        full = Booking.objects.get(date=self.day, time=time(15, 0))
+        Booking.objects.filter(pk=full.pk).update(status='cancelled')
+        release(self.day, full.time, full.persons)
+
+        form = BookingForm(data={'name': 'Гость', 'phone': '+79990000000',
+                                 'email': 'guest@example.com', 'date': self.day.isoformat(),
+                                 'time': '15:00', 'persons': 2})
+        self.assertTrue(form.is_valid(), form.errors)
+
+        self.client.force_login(self.user)
+        response = self.client.post('/api/booking/', {
+            'date': self.day.isoformat(), 'time': '15:00', 'persons': 2,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_non_positive_persons_are_rejected(self):
+        before = self.occupancy()
+        self.client.force_login(self.user)
+        body = {'date': self.day.isoformat(), 'time': '12:00', 'persons': -100}
+        response = self.client.post('/api/booking/', body, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('persons', response.json())
+
+        self.client.force_login(self.staff)
+        response = self.client.post('/api/booking/bulk/', {'create': [body]},
+                                    content_type='application/json')
+        self.assertIn('persons', response.json()['create'][0]['errors'])
+        self.assertEqual(self.occupancy(), before)
+
+        with self.assertRaises(ValueError):
+            reserve(self.day, time(12, 0), 0)
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def test_unchanged_source_is_not_reencoded(self):
+        buffer = BytesIO()
+        Image.new('RGB', (800, 600), (120, 80, 40)).save(buffer, 'PNG')
+        name = content_storage.save('menu_images/latte.png', ContentFile(buffer.getvalue()))
+        image = MenuItem(name='Латте', type='coffee', price=200, image=name).image
+
+        manifest = build_variants(image)
+        self.assertTrue(manifest['variants'])
+        with mock.patch('api.images._encode') as encode:
+            self.assertEqual(build_variants(image, manifest), manifest)
+        encode.assert_not_called()
+
+
+class IdempotencyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='guest', email='guest@example.com', password='secret-pass')
+
+    def setUp(self):
+        idempotent_responses.clear()
+        self.client.force_login(self.user)
+        self.payload = {'name': 'Гость', 'phone': '+79990000000', 'email': 'guest@example.com',
+                        'date': (timezone.localdate() + timedelta(days=1)).isoformat(),
+                        'time': '12:00', 'persons': 2}
+
+    def post(self, payload, key='booking-1'):
+        return self.client.post('/api/booking/', payload, content_type='application/json',
+                                headers={'Idempotency-Key': key})
+
+    def test_repeat_returns_stored_response(self):
+        first = self.post(self.payload)
+        second = self.post(self.payload)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json()['id'], first.json()['id'])
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_replay_survives_process_cache_loss(self):
+        first = self.post(self.payload)
+        idempotent_responses.clear()
+        second = self.post(self.payload)
+
+        self.assertEqual(second.json()['id'], first.json()['id'])
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_key_reused_for_different_request(self):
+        self.post(self.payload)
+        response = self.post(dict(self.payload, persons=3))
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_key_in_progress(self):
+        IdempotencyKey.objects.create(
+            key='booking-1', scope=f'/api/booking/:{self.user.pk}', fingerprint='',
+            expires_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(self.post(self.payload).status_code, 409)
+        self.assertEqual(Booking.objects.count(), 0)
+
+    def test_keys_are_scoped_per_user(self):
+        self.post(self.payload)
+        other = User.objects.create_user(
+            username='other', email='other@example.com', password='secret-pass')
+        self.client.force_login(other)
+        response = self.post(self.payload)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(Booking.objects.count(), 2)
+
+
+@override_settings(BOOKING_CAPACITY=4)
+class BookingBulkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = timezone.localdate() + timedelta(days=1)
+        cls.staff = User.objects.create_user(
+            username='staff', email='staff@example.com', password='secret-pass', is_staff=True)
+        cls.user = User.objects.create_user(
+            username='guest', email='guest@example.com', password='secret-pass')
+        cls.full = Booking.objects.create(date=cls.day, time=time(15, 0), persons=4)
+        cls.done = Booking.objects.create(date=cls.day, time=time(9, 0), persons=1,
+                                          status='cancelled')
+
+    def bulk(self, payload, user=None):
+        self.client.force_login(user or self.staff)
+        return self.client.post('/api/booking/bulk/', payload, content_type='application/json')
+
+    def item(self, **fields):
+        return dict({'name': 'Гость', 'phone': '+79990000000', 'email': 'guest@example.com',
+                     'date': self.day.isoformat(), 'time': '12:00', 'persons': 2}, **fields)
+
+    def test_partial_failure_reports_each_item(self):
+        response = self.bulk({
+            'create': [self.item(), self.item(persons='много'), self.item(time='15:00')],
+            'update': [
+                {'id': self.full.pk, 'status': 'confirmed'},
+                {'id': self.done.pk, 'status': 'confirmed'},
+                {'id': 999999, 'status': 'cancelled'},
+            ],
+        })
+
+        self.assertEqual(response.status_code, 200)
+        created, updated = response.json()['create'], response.json()['update']
+        self.assertEqual(created[0]['index'], 0)
+        self.assertTrue(Booking.objects.filter(pk=created[0]['id']).exists())
+        self.assertIn('persons', created[1]['errors'])
+        self.assertIn('time', created[2]['errors'])
+        self.assertEqual(updated[0], {'id': self.full.pk, 'status': 'confirmed'})
+        self.assertIn('error', updated[1])
+        self.assertEqual(updated[2]['id'], 999999)
+        self.assertIn('error', updated[2])
+        self.assertEqual(Booking.objects.count(), 3)
+        self.done.refresh_from_db()
+        self.assertEqual(self.done.status, 'cancelled')
+
+    def test_cancel_releases_capacity(self):
+        response = self.bulk({'update': [{'id': self.full.pk, 'status': 'cancelled'}]})
+        self.assertEqual(response.status_code, 200)
+
+        reserved = SlotReservation.objects.get(date=self.day, time=time(15, 0))
+        self.assertEqual(reserved.persons, 0)
+        created = self.bulk({'create': [self.item(time='15:00', persons=4)]}).json()['create']
+        self.assertIn('id', created[0])
+
+    @override_settings(BOOKING_BULK_LIMIT=2)
+    def test_limit(self):
+        response = self.bulk({'create': [self.item(), self.item(), self.item()]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_staff_only(self):
+        self.assertEqual(self.bulk({'create': [self.item()]}, user=self.user).status_code, 403)
+
+
+class PaginationAndFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='guest', email='guest@example.com', password='secret-pass')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='secret-pass')
+        created_at = timezone.now()
+        # Одинаковое время создания: порядок страниц держится на id
+        Booking.objects.bulk_create([
+            Booking(user=cls.user, date=timezone.localdate() + timedelta(days=i % 5),
+                    time=time(9, 0), persons=1, created_at=created_at)
+            for i in range(25)
+        ])
+        MenuItem.objects.create(name='Латте', type='coffee', price=200)
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertNotIn('count', page)
+            ids += [row['id'] for row in page['results']]
+            url = page['next']
+        return ids
+
+    def test_cursor_pages_cover_every_booking_once(self):
+        self.client.force_login(self.user)
+        ids = self.walk('/api/booking/?page_size=10')
+
+        expected = list(Booking.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_users_are_cursor_paginated(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(len(self.walk('/api/users/?page_size=1')), User.objects.count())
+
+    def test_fields_limits_booking_payload(self):
+        self.client.force_login(self.user)
+        rows = self.client.get('/api/booking/', {'fields': 'id,status'}).json()['results']
+        self.assertEqual(set(rows[0]), {'id', 'status'})
+
+    def test_fields_limits_menu_payload(self):
+        rows = self.client.get('/api/menu/', {'fields': 'id,price'}).json()['results']
+        self.assertEqual(rows, [{'id': rows[0]['id'], 'price': '200.00'}])
+
+    def test_unknown_fields_are_ignored(self):
+        self.client.force_login(self.user)
+        rows = self.client.get('/api/booking/', {'fields': 'id,password'}).json()['results']
+        self.assertEqual(set(rows[0]), {'id'})
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.item = MenuItem.objects.create(name='Латте', type='coffee', price=200)
+        cls.staff = User.objects.create_user(
+            username='staff', email='staff@example.com', password='secret-pass', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def etag(self, path, **headers):
+        response = self.client.get(path, headers=headers)
+        self.assertEqual(response.status_code, 200, path)
+        return response['ETag']
+
+    def test_unchanged_content_is_not_modified(self):
+        for path in ('/', '/menu/', '/promo/', '/api/menu/', '/api/promo/'):
+            etag = self.etag(path)
+            response = self.client.get(path, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304, path)
+            self.assertEqual(response.content, b'')
+
+    def test_menu_change_invalidates_etag(self):
+        etag = self.etag('/api/menu/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.price = 250
+            self.item.save()
+
+        response = self.client.get('/api/menu/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_representations_have_distinct_etags(self):
+        etags = [self.etag(path) for path in
+                 ('/', '/menu/', '/promo/', '/api/menu/', '/api/menu/?fields=id,price')]
+        self.assertEqual(len(set(etags)), len(etags))
+
+        self.client.force_login(self.staff)
+        json_etag = self.etag('/api/menu/', Accept='application/json')
+        html_etag = self.etag('/api/menu/', Accept='text/html')
+        self.assertNotEqual(json_etag, html_etag)
+
+    def test_vary_on_accept(self):
+        response = self.client.get('/api/menu/')
+        self.assertIn('Accept', response['Vary'])
+
+    def test_user_specific_pages_do_not_share_etag(self):
+        anonymous = self.etag('/')
+        self.client.force_login(self.staff)
+        self.assertNotEqual(self.etag('/'), anonymous)
+
+
+class MenuSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.latte = MenuItem.objects.create(
+            name='Латте', type='coffee', price=200, description='Эспрессо и молоко')
+        cls.cake = MenuItem.objects.create(
+            name='Шоколадное пирожное', type='desserts', price=250, description='С орехами')
+        cls.cocoa = MenuItem.objects.create(
+            name='Какао', type='coffee', price=180, description='Горячий шоколадный напиток')
+        cls.hidden = MenuItem.objects.create(
+            name='Шоколадный торт', type='desserts', price=300, is_active=False)
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='secret-pass')
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.json()['results']]
+
+    def test_word_forms_match(self):
+        self.assertEqual(self.names('/api/menu/', q='пирожные'), ['Шоколадное пирожное'])
+        self.assertEqual(self.names('/api/menu/', q='молоком'), ['Латте'])
+
+    def test_name_matches_rank_above_description(self):
+        self.assertEqual(self.names('/api/menu/', q='шоколад'),
+                         ['Шоколадное пирожное', 'Какао'])
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.names('/api/menu/', q='шоколад орех'), ['Шоколадное пирожное'])
+        self.assertEqual(self.names('/api/menu/', q='шоколад молоко'), [])
+
+    def test_inactive_items_are_hidden_from_guests_only(self):
+        self.assertNotIn('Шоколадный торт', self.names('/api/menu/', q='торт'))
+        self.client.force_login(self.admin)
+        self.assertEqual(self.names('/api/menu/', q='торт'), ['Шоколадный торт'])
+
+    def test_index_follows_changes(self):
+        self.latte.name = 'Раф'
+        self.latte.save()
+        self.assertEqual(self.names('/api/menu/', q='латте'), [])
+        self.assertEqual(self.names('/api/menu/', q='раф'), ['Раф'])
+
+        self.cake.delete()
+        self.assertEqual(search_ids('пирожное'), [])
+
+    def test_menu_page_and_admin_search(self):
+        response = self.client.get('/menu/', {'q': 'какао'})
+        self.assertContains(response, 'Какао')
+        self.assertNotContains(response, 'Латте')
+
+        self.client.force_login(self.admin)
+        response = self.client.get('/admin/api/menuitem/', {'q': 'пирожные'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.cake])
+
+
+class InstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='guest', email='guest@example.com', password='secret-pass')
+        MenuItem.objects.create(name='Латте', type='coffee', price=200)
+        for hour in range(9, 19):
+            Booking.objects.create(user=cls.user, date=timezone.localdate() + timedelta(days=1),
+                                   time=time(hour, 0), persons=1)
+
+    def timing(self, response):
+        return dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+
+    def test_server_timing(self):
+        self.client.force_login(self.user)
+        api = self.timing(self.client.get('/api/booking/'))
+        self.assertRegex(api['sql'], r'desc="[1-9]\d* queries"')
+        self.assertNotEqual(api['serializer'], 'dur=0.0')
+
+        page = self.timing(self.client.get('/contacts/'))
+        self.assertNotEqual(page['render'], 'dur=0.0')
+
+    def test_cache_backends_are_not_patched_by_default(self):
+        self.client.get('/api/menu/')
+        for cls in LocMemCache.__mro__:
+            for name in ('get', 'get_many'):
+                self.assertFalse(getattr(cls.__dict__.get(name), 'instrumented', False))
+
+    def test_cache_counting_is_reversible(self):
+        original = LocMemCache.__dict__['get']
+        with override_settings(INSTRUMENTATION_CACHE=True):
+            install()
+            try:
+                self.assertTrue(LocMemCache.get.instrumented)
+                cache.clear()
+                self.client.get('/api/menu/')
+                timing = self.timing(self.client.get('/api/menu/'))
+                self.assertNotIn('hits=0 ', timing['cache'])
+            finally:
+                uninstall()
+        self.assertIs(LocMemCache.__dict__['get'], original)
+
+
+class AuthCacheTests(TestCase):
+    def setUp(self):
+        auth_cache.clear()
+        self.user = User.objects.create_user(
+            username='guest', email='guest@example.com', password='secret-pass')
+        self.token = AccessToken.issue(self.user)
+        self.headers = {'authorization': f'Token {self.token.key}'}
+
+    def assertRejected(self, detail):
+        # SessionAuthentication стоит первой, поэтому DRF отвечает 403, а не 401
+        response = self.client.get('/api/booking/', headers=self.headers)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['detail'], detail)
+
+    def test_revoked_token_is_rejected_at_once(self):
+        self.assertEqual(self.client.get('/api/booking/', headers=self.headers).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        self.assertRejected('Недействительный токен.')
+
+    def test_deactivated_user_is_rejected_at_once(self):
+        self.assertEqual(self.client.get('/api/booking/', headers=self.headers).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertRejected('Пользователь неактивен или удален.')
+
+    def test_deploy_check_warns_about_local_cache(self):
+        self.assertEqual([warning.id for warning in check_auth_cache(None)], ['api.W001'])
+
+    def test_deploy_check_warns_about_local_default_cache(self):
+        self.assertEqual([warning.id for warning in check_default_cache(None)], ['api.W002'])
+
+
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(
+            username='guest@example.com', email='guest@example.com', password='secret-pass')
+
+    def login(self, body):
+        return self.client.post('/api/token/', body, content_type='application/json')
+
+    def test_list_body_is_rejected(self):
+        for url in ('/api/token/', '/api/register/'):
+            response = self.client.post(url, [{'email': 'guest@example.com'}],
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 400, url)
+
+    def test_throttled_before_password_check(self):
+        limit = int(settings.THROTTLE_RATES['login']['email'].split('/')[0])
+        body = {'email': 'Guest@Example.com', 'password': 'wrong-pass'}
+        with mock.patch('api.views.authenticate', return_value=None) as check:
+            for _ in range(limit):
+                self.assertEqual(self.login(body).status_code, 400)
+            self.assertEqual(check.call_count, limit)
+            response = self.login({**body, 'email': 'guest@example.com'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(check.call_count, limit)
+
+    def test_basic_auth_header_does_not_check_password(self):
+        header = {'authorization': 'Basic ' + base64.b64encode(b'guest@example.com:wrong').decode()}
+        with mock.patch('api.authentication.CachedModelBackend.authenticate',
+                        return_value=None) as check:
+            for url in ('/api/token/', '/api/register/', '/api/booking/'):
+                self.client.post(url, {}, content_type='application/json', headers=header)
+        check.assert_not_called()
+
+    @override_settings(THROTTLE_RATES={'login': {'ip': '2/m', 'email': '5/m'}})
+    def test_list_body_is_throttled_by_ip(self):
+        for _ in range(2):
+            self.assertEqual(self.login([]).status_code, 400)
+        self.assertEqual(self.login([]).status_code, 429)
+
+    @override_settings(THROTTLE_RATES={'login': {'ip': '30/m', 'email': '5/m'}})
+    def test_success_resets_email_counter(self):
+        with mock.patch('api.views.authenticate', return_value=None):
+            for _ in range(4):
+                self.login({'email': 'guest@example.com', 'password': 'wrong-pass'})
+        body = {'email': 'guest@example.com', 'password': 'secret-pass'}
+        self.assertEqual(self.login(body).status_code, 200)
+        with mock.patch('api.views.authenticate', return_value=None):
+            for _ in range(4):
+                self.assertEqual(self.login({**body, 'password': 'wrong-pass'}).status_code, 400)
+
+
+class AccessTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        auth_cache.clear()
+        self.user = User.objects.create_user(
+            username='guest@example.com', email='guest@example.com', password='secret-pass')
+
+    def auth(self, key):
+        return {'authorization': f'Token {key}'}
+
+    def test_login_issues_token_with_expiry(self):
+        response = self.client.post('/api/token/', {'email': 'guest@example.com',
+                                                    'password': 'secret-pass'})
+        self.assertEqual(response.status_code, 200)
+        token = AccessToken.objects.get(key=response.json()['token'])
+        self.assertAlmostEqual(token.expires_at, timezone.now() + timedelta(seconds=settings.TOKEN_TTL),
+                               delta=timedelta(minutes=1))
+
+    def test_expired_token_is_rejected(self):
+        token = AccessToken.issue(self.user)
+        AccessToken.objects.filter(pk=token.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        response = self.client.post('/api/token/rotate/', headers=self.auth(token.key))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], 'Срок действия токена истёк')
+
+    def test_rotation_replaces_token(self):
+        old = AccessToken.issue(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/token/rotate/', headers=self.auth(old.key))
+        self.assertEqual(response.status_code, 200)
+        new = response.json()['token']
+        self.assertNotEqual(new, old.key)
+        self.assertFalse(AccessToken.objects.filter(key=old.key).exists())
+
+        self.assertEqual(self.client.post('/api/token/rotate/', headers=self.auth(old.key)).status_code, 401)
+        self.assertEqual(self.client.get('/api/booking/', headers=self.auth(new)).status_code, 200)
+
+    @override_settings(TOKEN_MAX_PER_USER=2)
+    def test_oldest_tokens_over_limit_are_removed(self):
+        first = AccessToken.issue(self.user)
+        AccessToken.objects.filter(pk=first.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        kept = [AccessToken.issue(self.user).key for _ in range(2)]
+        self.assertCountEqual(AccessToken.objects.filter(user=self.user).values_list('key', flat=True), kept)
+
+
+class BookingStreamTests(TestCase):
+    url = '/api/booking/stream/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            username='staff', email='staff@example.com', password='secret-pass', is_staff=True)
+        cls.guest = User.objects.create_user(
+            username='guest', email='guest@example.com', password='secret-pass')
+
+    def open(self, **headers):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url, headers=headers)
+        self.addCleanup(self.close, response)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = iter(response.streaming_content)
+        self.assertTrue(next(chunks).startswith(b'retry: '))
+        return chunks
+
+    def close(self, response):
+        # Поток бесконечный и не дочитывается, поэтому закрываем его сами; сигнал
+        # request_finished закрыл бы соединение тестовой базы
+        with mock.patch.object(request_finished, 'send'):
+            response.close()
+
+    def test_only_staff_can_subscribe(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        response = self.client.get(self.url, headers={'authorization': 'Token missing'})
+        self.assertEqual(response.status_code, 401)
+        self.client.force_login(self.guest)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+    def test_new_booking_is_delivered(self):
+        chunks = self.open()
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(user=self.guest, persons=2, time=time(12, 0),
+                                             date=timezone.localdate() + timedelta(days=1))
+        chunk = next(chunks).decode()
+        self.assertIn(f'event: {CREATED}\n', chunk)
+        self.assertIn(f'"id": {booking.pk}', chunk)
+
+    def test_missed_events_are_replayed(self):
+        seen = broker.publish(CREATED, {'id': 1})
+        missed = broker.publish(CREATED, {'id': 2})
+        chunks = self.open(**{'last-event-id': seen.id})
+        self.assertEqual(next(chunks), missed.encode())
+
+    def test_unknown_event_id_resets_client(self):
+        chunks = self.open(**{'last-event-id': '0-1'})
+        self.assertIn(b'event: reset\n', next(chunks))
+
+
+class QueryPlanTests(TestCase):
+    # Таблицы, по которым не должно быть полного сканирования
+    HOT_TABLES = ('menu', 'promo', 'menu_promo', 'bookings', 'slot_reservation', 'api_user')
+    FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        cls.user = User.objects.create_user(
+            username='guest', email='guest@example.com', password='secret-pass')
+        cls.staff = User.objects.create_user(
+            username='staff', email='staff@example.com', password='secret-pass', is_staff=True)
+        items = MenuItem.objects.bulk_create([
+            MenuItem(name=f'Позиция {i}', type=('coffee', 'tea', 'desserts')[i % 3],
+                     price=100 + i, is_active=i % 5 != 0, is_popular=i % 4 == 0, sort_order=i)
+            for i in range(60)
+        ])
+        promos = Promo.objects.bulk_create([
+            Promo(title=f'Акция {i}', description='Описание',
+                  start_date=today - timedelta(days=30 - i), end_date=today + timedelta(days=i - 10),
+                  is_active=i % 3 != 0)
+            for i in range(30)
+        ])
+        MenuPromo.objects.bulk_create([
+            MenuPromo(menu_item=items[i], promo=promos[i % len(promos)], discount_percent=15) for i in range(0, 60, 2)
+        ])
+        for i in range(40):
+            Booking.objects.create(
+                user=cls.user if i % 2 else cls.staff, name='Гость', phone='+79990000000',
+                email='guest@example.com', date=today + timedelta(days=i % 7),
+                time=time(9 + i % 10, 0), persons=2)
+
+    def assert_no_full_scans(self, path, user=None, **params):
+        if user is not None:
+            self.client.force_login(user)
+        else:
+            self.client.logout()
+        cache.clear()
+        bump_version()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(path, params)
+        self.assertLess(response.status_code, 400, path)
+
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                details = [row[-1] for row in cursor.fetchall()]
+            for detail in details:
+                match = self.FULL_SCAN.match(detail)
+                if match and match.group(1) in self.HOT_TABLES:
+                    self.fail(f'{path}: полное сканирование {match.group(1)}\n{sql}\n{details}')
+
+    def test_menu(self):
+        self.assert_no_full_scans('/api/menu/')
+        self.assert_no_full_scans('/api/menu/', type='tea')
+        self.assert_no_full_scans('/api/menu/', user=self.staff)
+        self.assert_no_full_scans('/api/menu/', user=self.staff, type='tea')
+        self.assert_no_full_scans('/')
+        self.assert_no_full_scans('/menu/')
+        self.assert_no_full_scans('/menu/', type='coffee', popular='on')
+
+    def test_promo(self):
+        self.assert_no_full_scans('/api/promo/')
+        self.assert_no_full_scans('/api/promo/', user=self.staff)
+        self.assert_no_full_scans('/promo/')
+
+    def test_booking(self):
+        day = (timezone.localdate() + timedelta(days=1)).isoformat()
+        self.assert_no_full_scans('/api/booking/', user=self.user)
+        self.assert_no_full_scans('/api/booking/', user=self.staff)
+        self.assert_no_full_scans('/api/booking/availability/', date=day)
+        self.assert_no_full_scans('/booking/', date=day)
+        self.assert_no_full_scans('/profile/', user=self.user)
+
+    def test_users(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='secret-pass')
+        self.assert_no_full_scans('/api/users/', user=admin)
+
+
+class QueryBudgetTests(TestCase):
+    # Число запросов на холодный кэш не зависит от объёма данных и проверяется
+    # в каждом прогоне; задержки — только в PerformanceBudgetTests
+    MENU_ITEMS = 60
+    PROMOS = 20
+    BOOKINGS = 500
+    USERS = 20
+    CHECK_LATENCY = False
+
+    # (запросов на холодный кэш, миллисекунд на медиану)
+    BUDGETS = {
+        'home': (4, 100),
+        'menu_page': (4, 200),
+        'promo_page': (3, 100),
+        'profile_page': (4, 300),
+        'api_menu_list': (4, 100),
+        'api_menu_list_staff': (8, 150),
+        'api_menu_detail': (3, 50),
+        'api_promo_list': (3, 100),
+        'api_promo_list_staff': (7, 100),
+        'api_promo_detail': (2, 50),
+        'api_booking_list': (4, 100),
+        'api_booking_list_staff': (4, 100),
+        'api_booking_detail': (4, 50),
+        'api_booking_availability': (2, 50),
+        'api_user_list': (4, 100),
+        'api_user_detail': (4, 50),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        cls.superuser = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='secret-pass')
+        users = User.objects.bulk_create([
+            User(username=f'user{i}', email=f'user{i}@example.com', password='!')
+            for i in range(cls.USERS)
+        ])
+        cls.user = users[0]
+        items = MenuItem.objects.bulk_create([
+            MenuItem(name=f'Позиция {i}', description='Кофе с молоком и сиропом',
+                     type=MenuItem.TYPE_CHOICES[i % len(MenuItem.TYPE_CHOICES)][0],
+                     price=100 + i % 300, is_active=i % 10 != 0, is_popular=i % 7 == 0,
+                     sort_order=i)
+            for i in range(cls.MENU_ITEMS)
+        ])
+        promos = Promo.objects.bulk_create([
+            Promo(title=f'Акция {i}', description='Скидка на напитки',
+                  start_date=today - timedelta(days=i), end_date=today + timedelta(days=i - 5),
+                  is_active=i % 4 != 0)
+            for i in range(cls.PROMOS)
+        ])
+        MenuPromo.objects.bulk_create([
+            MenuPromo(menu_item=item, promo=promos[i % len(promos)], discount_percent=10 + i % 30)
+            for i, item in enumerate(items[::3])
+        ])
+        # bulk_create не вызывает save(), занятость слотов пересчитывается отдельно
+        statuses = [status for status, _ in Booking.STATUS_CHOICES]
+        bookings = (
+            Booking(user=users[i % len(users)], name='Гость', phone='+79990000000',
+                    email='guest@example.com', date=today + timedelta(days=i % 365 - 180),
+                    time=time(9 + i % 12, 30 * (i % 2)), persons=1,
+                    status=statuses[i % len(statuses)])
+            for i in range(cls.BOOKINGS)
+        )
+        Booking.objects.bulk_create(bookings, batch_size=5000)
+        rebuild(today + timedelta(days=1))
+        cls.item = items[1]
+        cls.promo = promos[9]
+        cls.booking = Booking.objects.filter(user=cls.user).first()
+
+    def measure(self, name, path, user=None, **params):
+        if user is not None:
+            self.client.force_login(user)
+        else:
+            self.client.logout()
+
+        # Холодный запрос: кэши сброшены, снимок меню и расписание акций строятся заново
+        cache.clear()
+        bump_version()
+        reset_queries()
+        with CaptureQueriesContext(connection) as ctx:
+            started = clock.perf_counter()
+            response = self.client.get(path, params)
+            cold_ms = (clock.perf_counter() - started) * 1000
+        self.assertEqual(response.status_code, 200, path)
+        queries = [query['sql'] for query in ctx.captured_queries]
+
+        max_queries, budget_ms = self.BUDGETS[name]
+        self.assertLessEqual(
+            len(queries), max_queries, f'{name}: слишком много запросов\n' + '\n'.join(queries))
+        if self.CHECK_LATENCY:
+            self.check_latency(name, path, params, len(queries), cold_ms, budget_ms)
+
+    def test_pages(self):
+        self.measure('home', '/')
+        self.measure('menu_page', '/menu/')
+        self.measure('promo_page', '/promo/')
+        self.measure('profile_page', '/profile/', user=self.user)
+
+    def test_menu_api(self):
+        self.measure('api_menu_list', '/api/menu/')
+        self.measure('api_menu_list_staff', '/api/menu/', user=self.superuser)
+        self.measure('api_menu_detail', f'/api/menu/{self.item.pk}/')
+
+    def test_promo_api(self):
+        self.measure('api_promo_list', '/api/promo/')
+        self.measure('api_promo_list_staff', '/api/promo/', user=self.superuser)
+        self.measure('api_promo_detail', f'/api/promo/{self.promo.pk}/')
+
+    def test_booking_api(self):
+        day = (timezone.localdate() + timedelta(days=1)).isoformat()
+        self.measure('api_booking_list', '/api/booking/', user=self.user)
+        self.measure('api_booking_list_staff', '/api/booking/', user=self.superuser)
+        self.measure('api_booking_detail', f'/api/booking/{self.booking.pk}/', user=self.user)
+        self.measure('api_booking_availability', '/api/booking/availability/', date=day)
+
+    def test_user_api(self):
+        self.measure('api_user_list', '/api/users/', user=self.superuser)
+        self.measure('api_user_detail', f'/api/users/{self.user.pk}/', user=self.superuser)
+
+
+@tag('perf')
+@skipUnless(os.getenv('PERF_TESTS') == '1', 'Замеры задержек: PERF_TESTS=1 manage.py test --tag perf')
+class PerformanceBudgetTests(QueryBudgetTests):
+    # Большой набор данных и медианы задержек; объём и бюджеты меняются через окружение,
+    # отчёт пишется в PERF_REPORT
+    MENU_ITEMS = int(os.getenv('PERF_MENU_ITEMS', '300'))
+    PROMOS = int(os.getenv('PERF_PROMOS', '40'))
+    BOOKINGS = int(os.getenv('PERF_BOOKINGS', '100000'))
+    USERS = 200
+    CHECK_LATENCY = True
+    RUNS = int(os.getenv('PERF_RUNS', '5'))
+    BUDGET_SCALE = float(os.getenv('PERF_BUDGET_SCALE', '1.0'))
+    REPORT = os.getenv('PERF_REPORT', str(settings.BASE_DIR / 'perf_report.json'))
+
+    results = []
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if not cls.results:
+            return
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': settings.DATABASES['default']['ENGINE'],
+            'dataset': {
+                'menu_items': cls.MENU_ITEMS,
+                'promos': cls.PROMOS,
+                'bookings': cls.BOOKINGS,
+                'users': cls.USERS,
+            },
+            'runs': cls.RUNS,
+            'endpoints': sorted(cls.results, key=lambda result: result['name']),
+        }
+        with open(cls.REPORT, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, ensure_ascii=False, indent=2)
+
+    def check_latency(self, name, path, params, queries, cold_ms, budget_ms):
+        timings = []
+        for _ in range(self.RUNS):
+            started = clock.perf_counter()
+            self.client.get(path, params)
+            timings.append((clock.perf_counter() - started) * 1000)
+
+        budget_ms *= self.BUDGET_SCALE
+        p50 = statistics.median(timings)
+        self.results.append({
+            'name': name,
+            'path': path,
+            'queries': queries,
+            'max_queries': self.BUDGETS[name][0],
+            'cold_ms': round(cold_ms, 2),
+            'p50_ms': round(p50, 2),
+            'max_ms': round(max(timings), 2),
+            'budget_ms': budget_ms,
+        })
+        self.assertLessEqual(p50, budget_ms, f'{name}: медиана {p50:.1f} мс')
@@ -0,0 +1,122 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+from .metrics import inc
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    count, _, period = rate.partition('/')
+    return int(count), PERIODS[period[0]]
+
+
+def client_ip(request):
+    # За обратным прокси адрес клиента берётся из X-Forwarded-For
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    proxies = settings.THROTTLE_NUM_PROXIES
+    if proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(',')]
+        return addresses[-min(proxies, len(addresses))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+class SlidingWindow:
+    # Скользящее окно из двух соседних фиксированных окон: текущий счётчик плюс
+    # доля предыдущего. Два чтения из кэша и один инкремент на попытку.
+    def __init__(self, scope, kind, rate):
+        self.scope = scope
+        self.kind = kind
+        self.limit, self.window = parse_rate(rate)
+
+    def keys(self, ident, now):
+        index = int(now // self.window)
+        prefix = f'throttle:{self.scope}:{self.kind}:{ident}'
+        return f'{prefix}:{index}', f'{prefix}:{index - 1}', now % self.window
+
+    def count(self, ident, now):
+        current, previous, elapsed = self.keys(ident, now)
+        values = cache.get_many([current, previous])
+        weight = 1 - elapsed / self.window
+        return values.get(current, 0) + values.get(previous, 0) * weight
+
+    def retry_after(self, ident, now):
+        return max(1, int(self.window - now % self.window))
+
+    def hit(self, ident, now):
+        current, _, _ = self.keys(ident, now)
+        cache.add(current, 0, self.window * 2)
+        try:
+            cache.incr(current)
+        except ValueError:
+            cache.set(current, 1, self.window * 2)
+
+    def reset(self, ident, now):
+        current, previous, _ = self.keys(ident, now)
+        cache.delete_many([current, previous])
+
+
+def windows(scope):
+    return [SlidingWindow(scope, kind, rate)
+            for kind, rate in settings.THROTTLE_RATES.get(scope, {}).items()]
+
+
+def identities(request, email):
+    result = {'ip': client_ip(request)}
+    if email:
+        result['email'] = str(email).strip().lower()
+    return result
+
+
+def attempt(request, scope, email=None):
+    # Проверяется до хэширования пароля; возвращает секунды до повтора или None
+    if not settings.THROTTLE_ENABLED:
+        return None
+    now = time.time()
+    idents = identities(request, email)
+    active = [(window, idents[window.kind]) for window in windows(scope)
+              if window.kind in idents]
+    for window, ident in active:
+        if window.count(ident, now) >= window.limit:
+            inc('throttled_total', scope=scope, kind=window.kind)
+            return window.retry_after(ident, now)
+    for window, ident in active:
+        window.hit(ident, now)
+    return None
+
+
+def succeeded(request, scope, email=None):
+    # Успешный вход не должен блокировать владельца аккаунта
+    if not settings.THROTTLE_ENABLED or not email:
+        return
+    now = time.time()
+    ident = identities(request, email)['email']
+    for window in windows(scope):
+        if window.kind == 'email':
+            window.reset(ident, now)
+
+
+class ScopedAttemptThrottle(BaseThrottle):
+    scope = None
+    email_field = 'email'
+
+    def allow_request(self, request, view):
+        # Тело может быть не объектом (список, строка) - тогда ограничение только по IP
+        data = request.data
+        email = data.get(self.email_field) if isinstance(data, dict) else None
+        self.retry = attempt(request, self.scope, email)
+        return self.retry is None
+
+    def wait(self):
+        return self.retry
+
+
+class LoginThrottle(ScopedAttemptThrottle):
+    scope = 'login'
+
+
+class RegisterThrottle(ScopedAttemptThrottle):
+    scope = 'register'
@@ -1,4 +1,4 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from . import views
 
@@ -9,7 +9,14 @@ router.register(r'booking', views.BookingViewSet)
 router.register(r'users', views.UserViewSet, basename='user')
 
 urlpatterns = [
+    # Чтение меню и акций обслуживают async-представления, запись — ViewSet'ы роутера
+    path('menu/', views.menu_list),
+    re_path(r'^menu/(?P<pk>[^/.]+)/$', views.menu_detail),
+    path('promo/', views.promo_list),
+    re_path(r'^promo/(?P<pk>[^/.]+)/$', views.promo_detail),
+    path('booking/stream/', views.booking_stream, name='booking-stream'),
     path('', include(router.urls)),
     path('token/', views.TokenView.as_view(), name='token'),
+    path('token/rotate/', views.TokenRotateView.as_view(), name='token-rotate'),
     path('register/', views.RegisterView.as_view(), name='register'),
 ]
\ No newline at end of file
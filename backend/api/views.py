@@ -1,37 +1,86 @@
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.authtoken.models import Token
-from rest_framework.authentication import TokenAuthentication, SessionAuthentication
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
+from django.conf import settings
 from django.contrib.auth import authenticate
-from .models import User, MenuItem, Promo, Booking
-from .serializers import (UserSerializer, MenuItemSerializer,
-                          PromoSerializer, BookingSerializer, TokenSerializer)
+from django.db import transaction
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from .authentication import CachedTokenAuthentication
+from .availability import get_day_availability
+from .booking_events import astream, stream
+from .bulk import create_bookings, transition_bookings
+from .conditional import conditional_content
+from .idempotency import idempotent
+from .pagination import CreatedAtCursorPagination
+from .menu_cache import aget_menu_snapshot, get_menu_snapshot
+from .metrics import record_login, render as render_metrics
+from .models import AccessToken, User, MenuItem, Promo, Booking
+from .promo_schedule import aget_promo_timeline, get_promo_timeline
+from .search import filter_items, search_ids
+from .throttling import LoginThrottle, RegisterThrottle, succeeded
+from .reservations import SlotUnavailable
+from .serializers import (UserSerializer, MenuItemSerializer, PromoSerializer,
+                          BookingSerializer, TokenSerializer, AvailabilitySerializer,
+                          BookingBulkSerializer)
 from .permissions import IsStaffOrReadOnly, IsSuperUser
 
 
 class TokenView(APIView):
+    # Пароль проверяется только в post(), после ограничения попыток
+    authentication_classes = []
     permission_classes = [AllowAny]
+    throttle_classes = [LoginThrottle]
 
     def post(self, request):
         serializer = TokenSerializer(data=request.data)
         if serializer.is_valid():
             user = authenticate(username=serializer.data['email'],
                                 password=serializer.data['password'])
+            record_login('api', user is not None)
             if user:
-                token, _ = Token.objects.get_or_create(user=user)
-                return Response({'token': token.key, 'user': UserSerializer(user).data})
+                succeeded(request, 'login', serializer.data['email'])
+                token = AccessToken.issue(user)
+                return Response({'token': token.key, 'expires_at': token.expires_at,
+                                 'user': UserSerializer(user).data})
             return Response({'error': 'Неверные данные'}, status=400)
         return Response(serializer.errors, status=400)
 
 
+class TokenRotateView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        token = AccessToken.objects.filter(key=request.auth).first()
+        if token is None:
+            return Response({'error': 'Токен не найден'}, status=400)
+        token = token.rotate()
+        return Response({'token': token.key, 'expires_at': token.expires_at})
+
+
 class RegisterView(APIView):
+    authentication_classes = []
     permission_classes = [AllowAny]
+    throttle_classes = [RegisterThrottle]
 
+    @idempotent
     def post(self, request):
-        email = request.data.get('email')
-        password = request.data.get('password')
+        data = request.data if isinstance(request.data, dict) else {}
+        email = data.get('email')
+        password = data.get('password')
 
         if not email or not password:
             return Response({'error': 'Нет email или пароля'}, status=400)
@@ -44,13 +93,13 @@ class RegisterView(APIView):
                 email=email,
                 username=email,
                 password=password,
-                first_name=request.data.get('first_name', ''),
-                last_name=request.data.get('last_name', ''),
-                phone=request.data.get('phone', ''),
+                first_name=data.get('first_name', ''),
+                last_name=data.get('last_name', ''),
+                phone=data.get('phone', ''),
                 role='user'
             )
 
-            token = Token.objects.create(user=user)
+            token = AccessToken.issue(user)
             return Response({'token': token.key, 'user': UserSerializer(user).data})
 
         except Exception as e:
@@ -69,7 +118,25 @@ class MenuItemViewSet(viewsets.ModelViewSet):
             qs = qs.filter(type=item_type)
         if not self.request.user.is_staff:
             qs = qs.filter(is_active=True)
-        return qs.order_by('sort_order', 'name')
+        query = self.request.query_params.get('q')
+        if query:
+            qs = qs.filter(pk__in=search_ids(query))
+        return qs.with_current_promos().order_by('sort_order', 'name')
+
+    @method_decorator(conditional_content)
+    def list(self, request, *args, **kwargs):
+        if request.user.is_staff:
+            return super().list(request, *args, **kwargs)
+
+        items = get_menu_snapshot().filter(request.query_params.get('type'))
+        query = request.query_params.get('q')
+        if query:
+            items = filter_items(items, query)
+        page = self.paginate_queryset(items)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        return Response(self.get_serializer(items, many=True).data)
 
 
 class PromoViewSet(viewsets.ModelViewSet):
@@ -85,24 +152,208 @@ class PromoViewSet(viewsets.ModelViewSet):
             qs = qs.filter(is_active=True, end_date__gte=today)
         return qs.order_by('-start_date')
 
+    @method_decorator(conditional_content)
+    def list(self, request, *args, **kwargs):
+        if request.user.is_staff:
+            return super().list(request, *args, **kwargs)
+
+        promos = get_promo_timeline().visible()
+        page = self.paginate_queryset(promos)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        return Response(self.get_serializer(promos, many=True).data)
+
+
+menu_list_view = MenuItemViewSet.as_view({'get': 'list', 'post': 'create'})
+menu_detail_view = MenuItemViewSet.as_view({
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'})
+promo_list_view = PromoViewSet.as_view({'get': 'list', 'post': 'create'})
+promo_detail_view = PromoViewSet.as_view({
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'})
+
+
+async def _reads_snapshot(request):
+    # Чтение без токена и без прав персонала обслуживается из снимков меню и акций
+    # прямо в цикле событий; всё остальное уходит в синхронные ViewSet'ы
+    if request.method not in ('GET', 'HEAD') or 'HTTP_AUTHORIZATION' in request.META:
+        return False
+    if 'format' in request.GET or 'text/html' in request.META.get('HTTP_ACCEPT', ''):
+        return False
+    user = await request.auser()
+    return not user.is_staff
+
+
+def _json_response(data, status=200):
+    response = HttpResponse(JSONRenderer().render(data), status=status,
+                            content_type='application/json')
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def _paginated(request, serializer_class, objects):
+    drf_request = Request(request)
+    paginator = api_settings.DEFAULT_PAGINATION_CLASS()
+    try:
+        page = paginator.paginate_queryset(objects, drf_request)
+    except exceptions.NotFound as exc:
+        return _json_response({'detail': exc.detail}, status=404)
+    context = {'request': drf_request}
+    if page is None:
+        return _json_response(serializer_class(objects, many=True, context=context).data)
+    data = serializer_class(page, many=True, context=context).data
+    return _json_response(paginator.get_paginated_response(data).data)
+
+
+def _detail(request, serializer_class, obj):
+    if obj is None:
+        return _json_response({'detail': exceptions.NotFound().detail}, status=404)
+    return _json_response(serializer_class(obj, context={'request': Request(request)}).data)
+
+
+@conditional_content
+async def _menu_snapshot_list(request):
+    items = (await aget_menu_snapshot()).filter(request.GET.get('type'))
+    query = request.GET.get('q')
+    if query:
+        items = await sync_to_async(filter_items)(items, query)
+    return _paginated(request, MenuItemSerializer, items)
+
+
+@conditional_content
+async def _promo_snapshot_list(request):
+    return _paginated(request, PromoSerializer, (await aget_promo_timeline()).visible())
+
+
+@csrf_exempt
+async def menu_list(request):
+    if await _reads_snapshot(request):
+        return await _menu_snapshot_list(request)
+    return await sync_to_async(menu_list_view)(request)
+
+
+@csrf_exempt
+async def menu_detail(request, pk):
+    if await _reads_snapshot(request):
+        return _detail(request, MenuItemSerializer, (await aget_menu_snapshot()).get(pk))
+    return await sync_to_async(menu_detail_view)(request, pk=pk)
+
+
+@csrf_exempt
+async def promo_list(request):
+    if await _reads_snapshot(request):
+        return await _promo_snapshot_list(request)
+    return await sync_to_async(promo_list_view)(request)
+
+
+@csrf_exempt
+async def promo_detail(request, pk):
+    if await _reads_snapshot(request):
+        promo = next((p for p in (await aget_promo_timeline()).visible()
+                      if str(p.pk) == pk), None)
+        return _detail(request, PromoSerializer, promo)
+    return await sync_to_async(promo_detail_view)(request, pk=pk)
+
+
+async def _stream_user(request):
+    # EventSource не умеет заголовки, поэтому основной способ — сессия;
+    # токен принимается для клиентов вне браузера
+    result = await sync_to_async(CachedTokenAuthentication().authenticate)(request)
+    if result is not None:
+        return result[0]
+    return await request.auser()
+
+
+async def booking_stream(request):
+    if request.method != 'GET':
+        return _json_response({'detail': exceptions.MethodNotAllowed(request.method).detail},
+                              status=405)
+    try:
+        user = await _stream_user(request)
+    except exceptions.AuthenticationFailed as exc:
+        return _json_response({'detail': exc.detail}, status=401)
+    if not user.is_authenticated:
+        return _json_response({'detail': exceptions.NotAuthenticated().detail}, status=403)
+    if not user.is_staff:
+        return _json_response({'detail': exceptions.PermissionDenied().detail}, status=403)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    # Под ASGI соединение обслуживает цикл событий, под WSGI — поток сервера
+    if isinstance(request, ASGIRequest):
+        content = astream(last_event_id)
+    else:
+        content = stream(last_event_id)
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 
 class BookingViewSet(viewsets.ModelViewSet):
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
-    authentication_classes = [SessionAuthentication, TokenAuthentication]
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         if self.request.user.is_staff or self.request.user.is_superuser:
             return Booking.objects.all()
         return Booking.objects.filter(user=self.request.user)
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        # Места проверяет условный UPDATE в reserve(), без предварительного чтения кэша
+        try:
+            serializer.save(user=self.request.user)
+        except SlotUnavailable:
+            raise ValidationError({'time': 'На это время нет свободных мест'})
+
+    def perform_update(self, serializer):
+        try:
+            serializer.save()
+        except SlotUnavailable:
+            raise ValidationError({'time': 'На это время нет свободных мест'})
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def bulk(self, request):
+        payload = BookingBulkSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        with transaction.atomic():
+            created = create_bookings(payload.validated_data['create'],
+                                      self.get_serializer_context())
+            updated = transition_bookings(payload.validated_data['update'])
+        return Response({'create': created, 'update': updated})
+
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def availability(self, request):
+        query = AvailabilitySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        availability = get_day_availability(query.validated_data['date'])
+        persons = query.validated_data['persons']
+        slots = availability.slots()
+        return Response({
+            'date': availability.day,
+            'persons': persons,
+            'capacity': availability.capacity,
+            'slots': [{'time': slot.strftime('%H:%M'), 'free': free} for slot, free in slots],
+            'available': [slot.strftime('%H:%M') for slot, free in slots if free >= persons],
+        })
 
 
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     permission_classes = [IsSuperUser]
+    pagination_class = CreatedAtCursorPagination
+
+
+def metrics_view(request):
+    # Сбор метрик Prometheus только с доверенных адресов
+    if not settings.METRICS_ENABLED or request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 from django.contrib.messages import constants as messages
 
@@ -46,6 +47,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.PrecompressedStaticMiddleware',
+    'api.middleware.InstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -57,10 +60,11 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'backend.urls'
 # Настройки REST Framework
 REST_FRAMEWORK = {
+    # Без BasicAuthentication: она проверяет пароль на каждом запросе до
+    # ограничения попыток (DRF аутентифицирует раньше, чем проверяет throttle)
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -70,7 +74,7 @@ REST_FRAMEWORK = {
 }
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'api.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR.parent / 'frontend/templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -95,9 +99,35 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Запись в транзакции берёт блокировку сразу, без взаимных блокировок
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # Файловая тестовая база: in-memory SQLite не поддерживает параллельную запись
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+CACHES = {
+    # Версия контента (меню, акции) и счётчики ограничения попыток. При нескольких
+    # воркерах нужен общий кэш, иначе правка меню видна только в своём процессе
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'daily-coffee'),
+    },
+    # Пользователи сессий и привязки токенов. При нескольких воркерах кэш обязан
+    # быть общим (Redis, Memcached): локальный кэш у каждого процесса свой, и
+    # отзыв токена, блокировка пользователя или смена пароля доходят до других
+    # процессов только через AUTH_CACHE_TTL (проверка check --deploy предупреждает)
+    'auth': {
+        'BACKEND': os.getenv('AUTH_CACHE_BACKEND', os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')),
+        'LOCATION': os.getenv('AUTH_CACHE_LOCATION', os.getenv('CACHE_LOCATION', 'daily-coffee') + '-auth'),
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -146,8 +176,65 @@ STATICFILES_DIRS = [
     BASE_DIR.parent / 'frontend/static',
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        # collectstatic без DEBUG: хэши в именах, манифест и сжатые копии
+        'BACKEND': ('django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+                    else 'api.staticfiles.CompressedManifestStaticFilesStorage'),
+    },
+}
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Ширины уменьшенных копий изображений меню и акций
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 960)
+
+# Бронирование столиков
+BOOKING_CAPACITY = int(os.getenv('BOOKING_CAPACITY', '40'))
+BOOKING_SLOT_MINUTES = int(os.getenv('BOOKING_SLOT_MINUTES', '30'))
+BOOKING_DURATION_MINUTES = int(os.getenv('BOOKING_DURATION_MINUTES', '120'))
+BOOKING_BULK_LIMIT = int(os.getenv('BOOKING_BULK_LIMIT', '500'))
+# Сколько секунд показывать занятость дня из кэша (только для отображения слотов)
+BOOKING_AVAILABILITY_TTL = int(os.getenv('BOOKING_AVAILABILITY_TTL', '30'))
+
+# Повторы POST-запросов с заголовком Idempotency-Key
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', str(60 * 60 * 24)))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', '1024'))
+
+# Фоновые задачи (manage.py runworker)
+JOBS_RUN_INLINE = os.getenv('JOBS_RUN_INLINE', 'False') == 'True'
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', '1.0'))
+JOBS_LOCK_TIMEOUT = int(os.getenv('JOBS_LOCK_TIMEOUT', '600'))
+JOBS_RETRY_BACKOFF = int(os.getenv('JOBS_RETRY_BACKOFF', '10'))
+
+# Замеры запросов (Server-Timing, лог api.instrumentation)
+INSTRUMENTATION_ENABLED = os.getenv('INSTRUMENTATION_ENABLED', 'True') == 'True'
+# Сколько одинаковых SQL за запрос считается признаком N+1
+INSTRUMENTATION_REPEAT_THRESHOLD = int(os.getenv('INSTRUMENTATION_REPEAT_THRESHOLD', '5'))
+# Попадания в кэш считаются подменой get/get_many у классов бэкендов кэша
+# во всём процессе, поэтому включаются явно
+INSTRUMENTATION_CACHE = os.getenv('INSTRUMENTATION_CACHE', 'False') == 'True'
+
+# Метрики Prometheus на /metrics: файлы процессов складываются в METRICS_DIR
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'daily-coffee-metrics'))
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api': {
+            'handlers': ['console'],
+            'level': os.getenv('LOG_LEVEL', 'WARNING'),
+        },
+    },
+}
 
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
@@ -157,5 +244,35 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'api.User'
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
+    'api.authentication.CachedModelBackend',
 ]
+# Сколько секунд держать в кэше пользователя сессии и привязку токена. Это же
+# максимальная задержка отзыва в других процессах, если кэш auth не общий
+AUTH_CACHE_TTL = int(os.getenv('AUTH_CACHE_TTL', '30'))
+# Токены API: срок жизни, число одновременных токенов пользователя и
+# как часто сохранять время последнего использования
+TOKEN_TTL = int(os.getenv('TOKEN_TTL', str(60 * 60 * 24 * 30)))
+TOKEN_MAX_PER_USER = int(os.getenv('TOKEN_MAX_PER_USER', '10'))
+TOKEN_LAST_USED_INTERVAL = int(os.getenv('TOKEN_LAST_USED_INTERVAL', '300'))
+# Ограничение попыток входа и регистрации (до хэширования пароля)
+THROTTLE_ENABLED = os.getenv('THROTTLE_ENABLED', 'True') == 'True'
+THROTTLE_NUM_PROXIES = int(os.getenv('THROTTLE_NUM_PROXIES', '0'))
+THROTTLE_RATES = {
+    'login': {
+        'ip': os.getenv('THROTTLE_LOGIN_IP', '30/m'),
+        'email': os.getenv('THROTTLE_LOGIN_EMAIL', '5/m'),
+    },
+    'register': {
+        'ip': os.getenv('THROTTLE_REGISTER_IP', '10/h'),
+    },
+}
+# cached_db читает сессию из кэша; для работы совсем без БД —
+# django.contrib.sessions.backends.cache или signed_cookies
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+# Поток событий бронирований для персонала (/api/booking/stream/). Очередь
+# событий в памяти процесса: при нескольких воркерах клиент видит только
+# брони, созданные в своём процессе
+BOOKING_STREAM_BUFFER = int(os.getenv('BOOKING_STREAM_BUFFER', '500'))
+BOOKING_STREAM_QUEUE = int(os.getenv('BOOKING_STREAM_QUEUE', '100'))
+BOOKING_STREAM_HEARTBEAT = float(os.getenv('BOOKING_STREAM_HEARTBEAT', '15'))
+BOOKING_STREAM_RETRY = int(os.getenv('BOOKING_STREAM_RETRY', '1000'))
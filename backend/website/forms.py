@@ -4,6 +4,7 @@ from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
 import re
 from datetime import date
+from api.availability import get_day_availability
 from api.models import User, Booking
 
 
@@ -203,6 +204,12 @@ class BookingForm(forms.ModelForm):
                 raise ValidationError('Мы работаем с 8:00 до 23:00')
         return booking_time
 
+    def clean_persons(self):
+        persons = self.cleaned_data.get('persons')
+        if persons is not None and persons < 1:
+            raise ValidationError('Укажите количество гостей')
+        return persons
+
     def clean_phone(self):
         phone = self.cleaned_data.get('phone', '').strip()
         if not phone:
@@ -242,6 +249,13 @@ class BookingForm(forms.ModelForm):
             if booking_datetime < current_datetime:
                 raise ValidationError('Выбранные дата и время уже прошли')
 
+            persons = cleaned_data.get('persons')
+            if persons:
+                availability = get_day_availability(date_value, fresh=True)
+                if not availability.can_book(time_value, persons):
+                    raise ValidationError(
+                        f'На это время свободно мест: {availability.free_seats(time_value)}')
+
         return cleaned_data
 
 
@@ -342,6 +356,16 @@ class MenuFilterForm(forms.Form):
         })
     )
 
+    q = forms.CharField(
+        label='Поиск',
+        required=False,
+        max_length=100,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Поиск по меню'
+        })
+    )
+
     popular = forms.BooleanField(
         label='Только популярные',
         required=False,
@@ -0,0 +1,30 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+
+from api.images import mime_type, srcset, variant_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(obj, sizes='100vw', **attrs):
+    image = obj.image
+    if not image:
+        return ''
+    manifest = obj.image_variants
+    attributes = flatatt(attrs)
+    variants = manifest.get('variants', {}) if manifest else {}
+    if not variants:
+        return format_html('<img src="{}"{}>', image.url, attributes)
+
+    fallback = 'jpeg' if 'jpeg' in variants else next(iter(variants))
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((mime_type(fmt), srcset(image, manifest, fmt), sizes)
+         for fmt in ('avif', 'webp') if fmt in variants and fmt != fallback)
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" loading="lazy"{}></picture>',
+        sources, variant_url(image, manifest, 640, fallback),
+        srcset(image, manifest, fallback), sizes, attributes)
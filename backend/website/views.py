@@ -1,64 +1,79 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import transaction
 from django.utils import timezone
-from api.models import MenuItem, Promo, Booking
+from api.availability import get_day_availability
+from api.conditional import conditional_content
+from api.menu_cache import aget_menu_snapshot
+from api.metrics import record_login
+from api.models import Booking
+from api.promo_schedule import aget_promo_timeline
+from api.reservations import SlotUnavailable
+from api.search import filter_items
+from api.throttling import attempt, succeeded
 from website.forms import (
     LoginForm, RegisterForm, BookingForm,
     ProfileUpdateForm, ChangePasswordForm, MenuFilterForm
 )
 
 
-def home(request):
-    try:
-        popular_items = MenuItem.objects.filter(
-            is_active=True,
-            is_popular=True
-        ).order_by('sort_order', 'name')[:6]
+# Шаблоны могут обращаться к кэшу и сессии синхронно, поэтому рендерятся в потоке
+arender = sync_to_async(render)
+
 
-        today = timezone.now().date()
-        current_promos = Promo.objects.filter(
-            is_active=True,
-            end_date__gte=today
-        ).order_by('-start_date')[:3]
+@conditional_content
+async def home(request):
+    today = timezone.now().date()
+    try:
+        # Популярные позиции и акции загружаются одновременно
+        snapshot, timeline = await asyncio.gather(aget_menu_snapshot(), aget_promo_timeline())
+        popular_items = snapshot.filter(popular=True)[:6]
+        current_promos = timeline.visible(today)[:3]
 
     except Exception as e:
         popular_items = []
         current_promos = []
 
-    return render(request, 'index.html', {
+    return await arender(request, 'index.html', {
         'popular_items': popular_items,
         'current_promos': current_promos,
         'today': today,
     })
 
 
-def menu_page(request):
+@conditional_content
+async def menu_page(request):
     try:
         form = MenuFilterForm(request.GET or None)
-        menu_items = MenuItem.objects.filter(is_active=True)
+        item_type = None
+        popular_only = False
+        query = ''
 
         if form.is_valid():
             item_type = form.cleaned_data.get('type')
             popular_only = form.cleaned_data.get('popular')
+            query = form.cleaned_data.get('q')
 
-            if item_type and item_type != 'all':
-                menu_items = menu_items.filter(type=item_type)
-
-            if popular_only:
-                menu_items = menu_items.filter(is_popular=True)
-
-        menu_items = menu_items.order_by('sort_order', 'name')
+        menu_items = (await aget_menu_snapshot()).filter(item_type, popular_only)
+        if query:
+            menu_items = await sync_to_async(filter_items)(menu_items, query)
 
     except Exception:
         menu_items = []
         form = MenuFilterForm()
+        item_type = None
+        query = ''
 
-    return render(request, 'menu.html', {
+    return await arender(request, 'menu.html', {
         'menu_items': menu_items,
         'form': form,
+        'selected_type': item_type,
+        'query': query,
     })
 
 
@@ -77,6 +92,8 @@ def booking_page(request):
                     request, f'Бронирование создано! Номер: {booking.id}')
                 return redirect('booking')
 
+            except SlotUnavailable:
+                form.add_error(None, 'На это время нет свободных мест')
             except Exception as e:
                 messages.error(request, f'Ошибка: {str(e)}')
     else:
@@ -90,26 +107,43 @@ def booking_page(request):
             })
         form = BookingForm(initial=initial)
 
-    return render(request, 'booking.html', {'form': form})
+    today = timezone.localdate()
+    slots_date = today
+    if form.is_bound:
+        slots_date = form.cleaned_data.get('date') or today
+    free_slots = get_day_availability(slots_date).free_slots()
+    if slots_date == today:
+        now = timezone.localtime().time()
+        free_slots = [slot for slot in free_slots if slot > now]
+
+    return render(request, 'booking.html', {
+        'form': form,
+        'slots_date': slots_date,
+        'free_slots': free_slots,
+    })
 
 
-def promo_page(request):
+@conditional_content
+async def promo_page(request):
     try:
-        today = timezone.now().date()
-        promos = Promo.objects.filter(
-            is_active=True,
-            end_date__gte=today
-        ).order_by('-start_date')
+        promos = (await aget_promo_timeline()).visible()
     except Exception:
         promos = []
 
-    return render(request, 'promo.html', {'promos': promos})
+    return await arender(request, 'promo.html', {'promos': promos})
 
 
 def contacts_page(request):
     return render(request, 'contacts.html')
 
 
+def throttled(request, template, form, retry_after):
+    messages.error(request, f'Слишком много попыток. Повторите через {retry_after} с.')
+    response = render(request, template, {'form': form}, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
 def login_page(request):
     if request.user.is_authenticated:
         messages.info(request, 'Вы уже вошли')
@@ -117,15 +151,20 @@ def login_page(request):
 
     if request.method == 'POST':
         form = LoginForm(request.POST)
+        retry_after = attempt(request, 'login', request.POST.get('email'))
+        if retry_after:
+            return throttled(request, 'login.html', form, retry_after)
         if form.is_valid():
             email = form.cleaned_data['email']
             password = form.cleaned_data['password']
 
             try:
                 user = authenticate(username=email, password=password)
+                record_login('site', user is not None and user.is_active)
 
                 if user is not None:
                     if user.is_active:
+                        succeeded(request, 'login', email)
                         login(request, user)
                         messages.success(request, f'Добро пожаловать!')
                         next_url = request.GET.get('next', 'home')
@@ -150,6 +189,9 @@ def register_page(request):
 
     if request.method == 'POST':
         form = RegisterForm(request.POST)
+        retry_after = attempt(request, 'register')
+        if retry_after:
+            return throttled(request, 'register.html', form, retry_after)
         if form.is_valid():
             try:
                 with transaction.atomic():